@@ -0,0 +1,134 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# --- Генератор синтетичних вивантажень заявок ---
+# Вивантаження схоже на справжнє: українські назви стовпців, змішані формати
+# дат, (за бажанням) серійні дати Excel, cp1251 і роздільник ";", кілька служб
+# через кому та задана частка повторень тієї ж проблеми на тому ж обладнанні.
+WORKSHOPS = 6
+LINES_PER_WORKSHOP = 4
+EQUIPMENT_PER_LINE = 12
+EQUIPMENT_KINDS = ["Прес", "Верстат", "Конвеєр", "Насос", "Компресор", "Піч", "Фасувальник", "Мішалка"]
+DESCRIPTIONS = [
+    "Не працює насос", "Витік масла", "Сторонній шум у редукторі", "Не вмикається двигун",
+    "Перегрів підшипника", "Зупинка конвеєра", "Спрацював захист", "Немає тиску повітря",
+    "Обрив ременя", "Заїдає клапан", "Не працює датчик рівня", "Протікає ущільнення",
+    "Вібрація на валу", "Помилка частотного перетворювача", "Не подається сировина",
+    "Зламаний ніж", "Не тримає температуру", "Засмічений фільтр", "Не працює освітлення",
+    "Коротке замикання", "Пошкоджений кабель", "Розлагодження датчика", "Злипання продукту",
+    "Відкалібрувати ваги", "Замінити мастило", "Не спрацьовує кінцевик", "Тече гідравліка",
+    "Люфт муфти", "Не працює пневмоциліндр", "Перевірити заземлення",
+]
+REQUEST_TYPES = ["Ремонт", "Простій", "Простій РЦ", "Профілактика", "Налагодження"]
+REQUEST_TYPE_SHARES = [0.45, 0.2, 0.05, 0.2, 0.1]
+SERVICES = ["КВП", "Механіки", "Електрики", "Енергетики", "Технологи"]
+# Формати дати та їх частки; час - з секундами або без. Дата з косою рискою -
+# лише місяць/день: застосунок розбирає неоднозначні дати саме так
+DATE_STYLES = [("%d.%m.%Y", 0.7), ("%Y-%m-%d", 0.2), ("%m/%d/%Y", 0.1)]
+TIME_STYLES = [("%H:%M", 0.8), ("%H:%M:%S", 0.2)]
+EXCEL_BASE_DATE = pd.Timestamp("1899-12-30")
+
+
+def _choice_by_share(rng, n_rows, styles):
+    formats, shares = zip(*styles)
+    return rng.choice(len(formats), n_rows, p=shares), formats
+
+
+def _format_mixed(rng, moments, present):
+    """Дата й час рядками у змішаних форматах; пропуски - None."""
+    dates = np.full(len(moments), None, dtype=object)
+    times = np.full(len(moments), None, dtype=object)
+    date_style, date_formats = _choice_by_share(rng, len(moments), DATE_STYLES)
+    time_style, time_formats = _choice_by_share(rng, len(moments), TIME_STYLES)
+    index = pd.DatetimeIndex(moments)
+    for style, fmt in enumerate(date_formats):
+        rows = present & (date_style == style)
+        dates[rows] = index[rows].strftime(fmt)
+    for style, fmt in enumerate(time_formats):
+        rows = present & (time_style == style)
+        times[rows] = index[rows].strftime(fmt)
+    return dates, times
+
+
+def _format_excel_serial(moments, present):
+    """Дата як серійний номер дня Excel, час - як частка доби."""
+    days = (pd.DatetimeIndex(moments) - EXCEL_BASE_DATE) / pd.Timedelta(days=1)
+    days = np.where(present, days, np.nan)
+    whole = np.floor(days)
+    return whole, days - whole
+
+
+def generate_requests(n_rows, seed=0, repeat_rate=0.15, span_days=730, excel_serial=False):
+    """Датафрейм вивантаження з `n_rows` заявок (усі значення - як у CSV-файлі).
+
+    `repeat_rate` - частка заявок, що повторюють проблему (обладнання й опис)
+    іншої заявки через 2 хвилини - 3 доби; `excel_serial` записує дати
+    виконання і закриття серійними номерами Excel.
+    """
+    rng = np.random.default_rng(seed)
+    equipment_count = WORKSHOPS * LINES_PER_WORKSHOP * EQUIPMENT_PER_LINE
+    equipment = rng.integers(0, equipment_count, n_rows)
+    description = rng.integers(0, len(DESCRIPTIONS), n_rows)
+    created = pd.Timestamp("2023-01-02").to_datetime64() + (
+        rng.integers(0, span_days * 24 * 60, n_rows).astype("timedelta64[m]")
+    )
+
+    # Повторення: проблема та місце іншої заявки, трохи пізніше за неї
+    repeats = np.flatnonzero(rng.random(n_rows) < repeat_rate)
+    sources = rng.integers(0, n_rows, len(repeats))
+    equipment[repeats] = equipment[sources]
+    description[repeats] = description[sources]
+    created[repeats] = created[sources] + rng.integers(2, 3 * 24 * 60, len(repeats)).astype("timedelta64[m]")
+
+    order = np.argsort(created, kind="stable")
+    equipment, description, created = equipment[order], description[order], created[order]
+    executed = created + np.round(rng.lognormal(3.7, 1.0, n_rows)).astype("timedelta64[m]")
+    closed = executed + np.round(rng.lognormal(4.5, 1.0, n_rows)).astype("timedelta64[m]")
+    has_execution = rng.random(n_rows) > 0.1
+    has_closure = has_execution & (rng.random(n_rows) > 0.15)
+
+    line = equipment // EQUIPMENT_PER_LINE
+    workshop = line // LINES_PER_WORKSHOP
+    kinds = np.asarray(EQUIPMENT_KINDS, dtype=object)[equipment % len(EQUIPMENT_KINDS)]
+    service_count = rng.choice([1, 2, 3], n_rows, p=[0.7, 0.22, 0.08])
+    service_sets = [", ".join(rng.choice(SERVICES, count, replace=False)) for count in range(1, 4) for _ in range(8)]
+    services = np.asarray(service_sets, dtype=object)[(service_count - 1) * 8 + rng.integers(0, 8, n_rows)]
+
+    df = pd.DataFrame({"Ідентифікатор": rng.permutation(n_rows) + 100_000})
+    df["Дата створення"], df["Час створення"] = _format_mixed(rng, created, np.ones(n_rows, dtype=bool))
+    if excel_serial:
+        df["Дата виконання"], df["Час виконання"] = _format_excel_serial(executed, has_execution)
+        df["Дата закриття"], df["Час закриття"] = _format_excel_serial(closed, has_closure)
+    else:
+        df["Дата виконання"], df["Час виконання"] = _format_mixed(rng, executed, has_execution)
+        df["Дата закриття"], df["Час закриття"] = _format_mixed(rng, closed, has_closure)
+    df["Тип заявки"] = rng.choice(REQUEST_TYPES, n_rows, p=REQUEST_TYPE_SHARES)
+    df["Цех"] = [f"Цех {w + 1}" for w in workshop]
+    df["Лінія"] = [f"Лінія {w + 1}.{l % LINES_PER_WORKSHOP + 1}" for w, l in zip(workshop, line)]
+    df["Обладнання"] = [f"{kind} {e + 1}" for kind, e in zip(kinds, equipment)]
+    df["Опис робіт"] = np.asarray(DESCRIPTIONS, dtype=object)[description]
+    df["Відповідальні служби"] = services
+    return df
+
+
+def to_csv_bytes(df, encoding="cp1251", sep=";"):
+    return df.to_csv(sep=sep, index=False).encode(encoding)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерує синтетичний CSV-файл із заявками.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Кількість заявок")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat-rate", type=float, default=0.15, help="Частка повторень")
+    parser.add_argument("--excel-serial", action="store_true", help="Дати виконання і закриття - серійні номери Excel")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Шлях до CSV-файлу")
+    args = parser.parse_args(argv)
+    df = generate_requests(args.rows, seed=args.seed, repeat_rate=args.repeat_rate, excel_serial=args.excel_serial)
+    args.output.write_bytes(to_csv_bytes(df))
+
+
+if __name__ == "__main__":
+    main()
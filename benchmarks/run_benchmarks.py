@@ -0,0 +1,191 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.generate_requests import generate_requests, to_csv_bytes  # noqa: E402
+from csv_loader import load_csv  # noqa: E402
+from export_writer import write_export  # noqa: E402
+from filter_engine import FilterEngine  # noqa: E402
+from pipeline import EXCEL_MAX_ROWS, REPORT_COLUMNS, downtime_by_equipment, summary_metrics, unique_tasks  # noqa: E402
+from preparation import enrich_rows, flag_repeats  # noqa: E402
+from rollup_cube import build_rollup_cube  # noqa: E402
+from services_index import build_services_index, explode_services  # noqa: E402
+
+# --- Бенчмарки етапів обробки на синтетичних вивантаженнях ---
+# Кожен етап запускається окремо: спершу для вимірювання часу (найкращий з
+# --repeat запусків), потім один раз під tracemalloc для пікової пам'яті
+# (tracemalloc сповільнює код, тому час і пам'ять не міряються разом).
+# Результати пишуться в JSON і порівнюються з попереднім запуском через --compare.
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _stages(csv_bytes):
+    """Етапи в порядку виконання; кожен отримує стан попередніх і повертає (стан, рядків на виході)."""
+    state = {}
+
+    def load():
+        state["df"], _ = load_csv(csv_bytes)
+        return len(state["df"])
+
+    def datetime_parsing():
+        state["df"], _ = enrich_rows(state["df"].copy())
+        return len(state["df"])
+
+    def anomaly_detection():
+        state["df"], _ = flag_repeats(state["df"])
+        return int(state["df"]["Підозріле повторення"].sum())
+
+    def filtering():
+        df = state["df"]
+        engine = FilterEngine(df)
+        start, end = engine.date_range()
+        workshops = engine.options("Цех")[: max(1, len(engine.options("Цех")) // 2)]
+        mask = engine.combine([
+            engine.date_mask(start + (end - start) / 4, end),
+            engine.category_mask("Цех", workshops),
+        ])
+        state["filtered"] = df[mask]
+        return len(state["filtered"])
+
+    def explode():
+        df, filtered = state["df"], state["filtered"]
+        services_index = build_services_index(df["Відповідальні служби"])
+        state["exploded"] = explode_services(filtered, df.index.get_indexer(filtered.index), services_index)
+        return len(state["exploded"])
+
+    def aggregation():
+        tasks = unique_tasks(state["filtered"])
+        cells = build_rollup_cube(tasks)
+        days = pd.to_datetime(tasks["Дата створення (для фільтра)"])
+        downtime = downtime_by_equipment(tasks, days.min(), days.max() + pd.Timedelta(days=1))
+        summary_metrics(cells, downtime)
+        return len(cells)
+
+    def excel_export():
+        # Аркуш Excel вміщує не більше ~1 млн рядків
+        exported = state["exploded"][[col for col in REPORT_COLUMNS if col in state["exploded"].columns]]
+        write_export(exported.head(EXCEL_MAX_ROWS), "xlsx")
+        return min(len(exported), EXCEL_MAX_ROWS)
+
+    return [
+        ("load", load), ("datetime_parsing", datetime_parsing), ("anomaly_detection", anomaly_detection),
+        ("filtering", filtering), ("explode", explode), ("aggregation", aggregation), ("excel_export", excel_export),
+    ], state
+
+
+def _rows_in(state, name):
+    if name == "load":
+        return None
+    if name == "excel_export":
+        return len(state["exploded"])
+    if name == "explode":
+        return len(state["filtered"])
+    return len(state["df"])
+
+
+def run_size(n_rows, repeat, seed, measure_memory, skip):
+    generated = generate_requests(n_rows, seed=seed)
+    csv_bytes = to_csv_bytes(generated)
+    del generated
+    results = []
+    stages, state = _stages(csv_bytes)
+    # Стан попереднього етапу зберігається, щоб повторні запуски етапу мали ті самі вхідні дані
+    for name, stage in stages:
+        if name in skip:
+            continue
+        snapshot = dict(state)
+        rows_in = _rows_in(state, name)
+        timings = []
+        for _ in range(repeat):
+            state.clear()
+            state.update(snapshot)
+            gc.collect()
+            started = time.perf_counter()
+            rows_out = stage()
+            timings.append(time.perf_counter() - started)
+        peak_mb = None
+        if measure_memory:
+            state.clear()
+            state.update(snapshot)
+            gc.collect()
+            tracemalloc.start()
+            stage()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        results.append({
+            "rows": n_rows, "stage": name, "seconds": min(timings), "peak_mb": peak_mb,
+            "rows_in": rows_in, "rows_out": rows_out, "csv_mb": len(csv_bytes) / 2**20,
+        })
+        print(f"{n_rows:>9} {name:<18} {min(timings):9.3f} s" + (f" {peak_mb:9.1f} MB" if peak_mb is not None else ""), flush=True)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Таблиця зміни часу та пам'яті кожного етапу відносно попереднього запуску."""
+    key = ["rows", "stage"]
+    old = pd.DataFrame(previous["results"]).set_index(key)
+    new = pd.DataFrame(current["results"]).set_index(key)
+    joined = new[["seconds", "peak_mb"]].join(old[["seconds", "peak_mb"]], rsuffix="_before", how="inner")
+    joined["time_ratio"] = joined["seconds"] / joined["seconds_before"]
+    joined["memory_ratio"] = joined["peak_mb"] / joined["peak_mb_before"]
+    return joined
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки етапів обробки заявок на синтетичних даних.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Кількість рядків (10000 ... 5000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Запусків кожного етапу для вимірювання часу")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Не вимірювати пікову пам'ять")
+    parser.add_argument("--skip", nargs="*", default=[], help="Етапи, які пропустити (наприклад, excel_export)")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Файл результатів JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="Попередні результати JSON для порівняння")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_rows in args.sizes:
+        results.extend(run_size(n_rows, args.repeat, args.seed, not args.no_memory, set(args.skip)))
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or REPO_ROOT / f"bench_{report['revision'] or 'results'}.json"
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Результати: {output}")
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(compare(previous, report).round(3))
+
+
+if __name__ == "__main__":
+    main()
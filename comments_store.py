@@ -0,0 +1,66 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from history_store import normalize_ids, store_lock
+
+# --- Окреме сховище коментарів "Реакція на заявки" ---
+# Коментарі зберігаються за ідентифікатором заявки, а не разом із таблицею,
+# тому не зникають при зміні фільтрів чи сторінки і підставляються в дані
+# лише під час показу сторінки та експорту. Очищений коментар зберігається
+# як порожній рядок: він перекриває коментар, що був у самому файлі.
+COMMENTS_DIR = Path(os.environ.get("DOWNTIME_COMMENTS_DIR", Path(__file__).resolve().parent / "comments"))
+COMMENTS_FILE = "comments.json"
+COMMENT_COL = "Реакція на заявки"
+ID_COL = "Ідентифікатор"
+BUSY_MESSAGE = "⚠️ Сховище коментарів зайняте іншою сесією. Спробуйте ще раз."
+
+
+def load_comments(store_dir=COMMENTS_DIR):
+    """Усі збережені коментарі: ідентифікатор (рядок) -> текст."""
+    comments_path = Path(store_dir) / COMMENTS_FILE
+    if not comments_path.exists():
+        return {}
+    with open(comments_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_comments(updates, store_dir=COMMENTS_DIR):
+    """Додає або змінює коментарі `updates` (ідентифікатор -> текст) і повертає всі коментарі."""
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    # Читання і запис під одним блокуванням, щоб не втратити зміни інших сесій
+    with store_lock(store_dir, BUSY_MESSAGE):
+        comments = load_comments(store_dir)
+        comments.update({str(key): "" if pd.isna(text) else str(text) for key, text in updates.items()})
+        comments_path = store_dir / COMMENTS_FILE
+        tmp_path = comments_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(comments, f, ensure_ascii=False)
+        os.replace(tmp_path, comments_path)
+    return comments
+
+
+def merge_comments(df, comments):
+    """Копія `df`, у якій стовпець коментарів доповнено збереженими коментарями."""
+    merged = df.copy()
+    original = merged[COMMENT_COL].fillna("").astype(str) if COMMENT_COL in merged.columns else ""
+    if ID_COL in merged.columns and comments:
+        stored = normalize_ids(merged[ID_COL]).map(comments)
+        merged[COMMENT_COL] = stored.fillna(original)
+    else:
+        merged[COMMENT_COL] = original
+    return merged
+
+
+def comment_changes(before, after):
+    """Зміни коментарів між показаною та відредагованою сторінкою: ідентифікатор -> текст."""
+    old = before[COMMENT_COL].fillna("").astype(str).to_numpy()
+    new = after[COMMENT_COL].fillna("").astype(str).to_numpy()
+    changed = old != new
+    if not changed.any():
+        return {}
+    keys = normalize_ids(before[ID_COL]).to_numpy()
+    return {key: text for key, text in zip(keys[changed], new[changed]) if key is not None}
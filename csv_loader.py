@@ -0,0 +1,142 @@
+import codecs
+import csv
+from collections import namedtuple
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+DEFAULT_ENGINE = "pyarrow"
+
+SNIFF_BYTES = 64 * 1024
+CANDIDATE_DELIMITERS = [";", ",", "\t", "|"]
+CANDIDATE_ENCODINGS = ["utf-8", "cp1251"]
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Стовпці з повторюваними текстовими значеннями завжди читаються як рядки
+TEXT_COLUMNS = ["Цех", "Лінія", "Обладнання", "Тип заявки", "Опис робіт", "Відповідальні служби"]
+# Стовпці дати/часу читаються як рядки, щоб рушій не вгадував типи сам;
+# суто числові стовпці (серійні дати Excel) потім повертаються до чисел
+DATE_TIME_COLUMNS = [
+    "Дата створення", "Час створення", "Дата виконання",
+    "Час виконання", "Дата закриття", "Час закриття",
+]
+
+# Ті самі значення, які pandas.read_csv за замовчуванням вважає пропущеними
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+]
+
+CsvDetection = namedtuple("CsvDetection", ["encoding", "bom", "delimiter", "engine", "rows", "columns"])
+
+
+def _detect_encoding(file_bytes):
+    for bom, encoding in BOMS:
+        if file_bytes.startswith(bom):
+            return encoding, True
+    for encoding in CANDIDATE_ENCODINGS:
+        # Перевіряється весь файл, а не лише вибірка: у файлі cp1251 перші
+        # кілобайти часто суто ASCII, і тоді один прохід парсера впав би на
+        # першій кириличній літері. Декодування без збереження результату дешеве
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for start in range(0, len(file_bytes), 1024 * 1024):
+                decoder.decode(file_bytes[start:start + 1024 * 1024])
+            decoder.decode(b"", final=True)
+            return encoding, False
+        except UnicodeDecodeError:
+            continue
+    return CANDIDATE_ENCODINGS[-1], False
+
+
+def _detect_delimiter(sample_text):
+    lines = sample_text.splitlines()
+    # Останній рядок вибірки може бути обрізаним
+    if len(lines) > 1:
+        lines = lines[:-1]
+    best_delimiter, best_width = CANDIDATE_DELIMITERS[0], 0
+    for delimiter in CANDIDATE_DELIMITERS:
+        widths = [len(row) for row in csv.reader(lines, delimiter=delimiter) if row]
+        if not widths:
+            continue
+        header_width = widths[0]
+        consistent = sum(1 for width in widths if width == header_width) / len(widths)
+        if header_width > best_width and consistent >= 0.9:
+            best_delimiter, best_width = delimiter, header_width
+    return best_delimiter, best_width
+
+
+def sniff_csv(file_bytes):
+    """Визначає кодування, BOM та роздільник за вмістом файлу."""
+    encoding, has_bom = _detect_encoding(file_bytes)
+    sample_text = file_bytes[:SNIFF_BYTES].decode(encoding, errors="ignore")
+    delimiter, _ = _detect_delimiter(sample_text)
+    header = next(csv.reader(sample_text.splitlines()[:1], delimiter=delimiter), [])
+    return encoding, has_bom, delimiter, header
+
+
+def _restore_numeric_columns(df, columns):
+    for col in columns:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        # Швидка перевірка на вибірці, щоб не перетворювати весь текстовий стовпець
+        sample = values.head(1000).dropna()
+        if sample.empty or pd.to_numeric(sample, errors="coerce").isna().any():
+            continue
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.notna().sum() == values.notna().sum():
+            df[col] = numeric
+
+
+def _read_with_pyarrow(file_bytes, delimiter, encoding, string_columns):
+    # Типи задаються безпосередньо парсеру: через pandas вони застосовуються
+    # лише після того, як pyarrow уже перетворив час і дати на власні типи
+    table = pa_csv.read_csv(
+        BytesIO(file_bytes),
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={col: pa.string() for col in string_columns},
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def load_csv(file_bytes, engine=DEFAULT_ENGINE):
+    """Читає CSV за один прохід і повертає датафрейм разом із результатом визначення формату."""
+    encoding, has_bom, delimiter, header = sniff_csv(file_bytes)
+    string_columns = [col for col in TEXT_COLUMNS + DATE_TIME_COLUMNS if col in header]
+    df = None
+    if engine == "pyarrow":
+        try:
+            df = _read_with_pyarrow(file_bytes, delimiter, encoding, string_columns)
+        except (pa.ArrowInvalid, ValueError):
+            # pyarrow суворіший до нестандартних файлів - читаємо стандартним рушієм
+            engine = "c"
+    if df is None:
+        df = pd.read_csv(
+            BytesIO(file_bytes), sep=delimiter, encoding=encoding,
+            dtype={col: str for col in string_columns} or None,
+        )
+    _restore_numeric_columns(df, DATE_TIME_COLUMNS)
+    detection = CsvDetection(encoding, has_bom, delimiter, engine, len(df), len(df.columns))
+    return df, detection
+
+
+def describe_detection(detection):
+    delimiter = {"\t": "табуляція"}.get(detection.delimiter, detection.delimiter)
+    return (
+        f"Кодування: {detection.encoding}{' (BOM)' if detection.bom else ''}; "
+        f"роздільник: «{delimiter}»; рушій: {detection.engine}; "
+        f"рядків: {detection.rows}, стовпців: {detection.columns}"
+    )
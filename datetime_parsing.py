@@ -0,0 +1,163 @@
+import re
+
+import pandas as pd
+import numpy as np
+from pandas.errors import OutOfBoundsDatetime, OutOfBoundsTimedelta
+
+# --- Формати дати/часу у порядку пріоритету ---
+date_formats = ["%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
+time_formats = ["%H:%M:%S", "%H:%M"]
+combined_datetime_formats = [f"{d_fmt} {t_fmt}" for d_fmt in date_formats for t_fmt in time_formats]
+combined_datetime_formats = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M",
+    "%Y-%m-%dT%H:%M:%S"
+] + combined_datetime_formats
+combined_datetime_formats.extend(date_formats)
+combined_datetime_formats = list(dict.fromkeys(combined_datetime_formats))
+
+EXCEL_BASE_DATE = pd.Timestamp('1899-12-30')
+
+
+def combine_and_convert_datetime(row, date_col_name, time_col_name=None):
+    """Порядкове перетворення: використовується лише для залишку, який не розібрав векторний шлях."""
+    date_val = row.get(date_col_name)
+    time_val = row.get(time_col_name) if time_col_name else None
+    if pd.isna(date_val) and (time_col_name is None or pd.isna(time_val)):
+        return np.nan
+    try:
+        if pd.api.types.is_numeric_dtype(type(date_val)) and pd.notna(date_val):
+            base_date = pd.to_datetime('1899-12-30')
+            converted_date = base_date + pd.to_timedelta(date_val, unit='D')
+            if pd.notna(converted_date):
+                if time_col_name and pd.api.types.is_numeric_dtype(type(time_val)) and pd.notna(time_val):
+                    converted_time = pd.to_timedelta(time_val, unit='D')
+                    return converted_date + converted_time
+                return converted_date
+    except Exception:
+        pass
+    date_str = str(date_val).strip() if pd.notna(date_val) else ""
+    time_str = str(time_val).strip() if pd.notna(time_val) else ""
+    combined_str = f"{date_str} {time_str}" if date_str and time_str else date_str or time_str
+    if not combined_str:
+        return np.nan
+    for fmt in combined_datetime_formats:
+        try:
+            return pd.to_datetime(combined_str, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    try:
+        return pd.to_datetime(combined_str, infer_datetime_format=True, errors='coerce')
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _is_numeric_column(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _is_text_value(series):
+    # Значення, які порядкова функція обробила б як рядок (а не як число Excel)
+    if isinstance(series.dtype, pd.StringDtype):
+        return series.notna()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        return series.notna()
+    return series.map(lambda v: isinstance(v, str)).astype(bool)
+
+
+def format_separators(fmt):
+    """Роздільники формату (крім пробілів), які обов'язково є в кожному значенні цього формату.
+
+    Формат не може збігтися зі значенням без хоча б одного з них, тож такі
+    значення для цього формату не перевіряються; порядок пріоритету не змінюється.
+    """
+    return set(re.sub(r"%.", "", fmt)) - {" "}
+
+
+def _parse_excel_serials(date_values, time_values):
+    converted = EXCEL_BASE_DATE + pd.to_timedelta(date_values, unit='D')
+    if time_values is not None:
+        time_delta = pd.to_timedelta(time_values, unit='D')
+        converted = converted.where(time_delta.isna(), converted + time_delta)
+    return converted
+
+
+def parse_datetime_columns(df, date_col_name, time_col_name=None):
+    """Векторно перетворює пару стовпців дата/час у datetime.
+
+    Числові стовпці трактуються як серійні дати Excel, текстові розбираються
+    форматами у порядку пріоритету, як у порядковій функції: кожен формат
+    перевіряється лише на ще не розібраних значеннях, що містять його
+    роздільники. Лише рядки, які не вдалося
+    розібрати, проходять через `combine_and_convert_datetime`.
+    """
+    n_rows = len(df)
+    empty_col = pd.Series(np.nan, index=pd.RangeIndex(n_rows), dtype=object)
+    date_col = df[date_col_name].reset_index(drop=True) if date_col_name in df.columns else empty_col
+    has_time = bool(time_col_name) and time_col_name in df.columns
+    time_col = df[time_col_name].reset_index(drop=True) if has_time else empty_col
+
+    result = pd.Series(pd.NaT, index=date_col.index, dtype='datetime64[ns]')
+    date_present = date_col.notna()
+    time_present = time_col.notna()
+    pending = date_present | time_present
+
+    # --- Серійні дати Excel (базова дата 1899-12-30) ---
+    if _is_numeric_column(date_col):
+        numeric_rows = date_present
+        if _is_numeric_column(time_col):
+            numeric_time = time_col[numeric_rows]
+        else:
+            # Нечислові значення часу ігноруються, як і в порядковій функції
+            numeric_rows &= ~time_present | _is_text_value(time_col)
+            numeric_time = None
+        try:
+            converted = _parse_excel_serials(date_col[numeric_rows], numeric_time).dropna()
+            result[converted.index] = converted
+            pending[converted.index] = False
+        except (ValueError, OverflowError, OutOfBoundsDatetime, OutOfBoundsTimedelta):
+            pass
+    else:
+        text_rows = pending & (~date_present | _is_text_value(date_col))
+        text_rows &= ~time_present | _is_text_value(time_col)
+
+        # --- Текстові дати: один to_datetime на формат, у порядку пріоритету ---
+        if text_rows.any():
+            date_str = date_col[text_rows].astype(str).str.strip().where(date_present[text_rows], "")
+            time_str = time_col[text_rows].astype(str).str.strip().where(time_present[text_rows], "")
+            both = (date_str != "") & (time_str != "")
+            combined = (date_str + " " + time_str).where(both, date_str + time_str)
+            # Порожній рядок після обрізання пробілів означає відсутню дату
+            pending[combined.index[combined == ""]] = False
+            combined = combined[combined != ""]
+
+            unparsed = np.ones(len(combined), dtype=bool)
+            has_separator = {
+                sep: combined.str.contains(sep, regex=False).to_numpy()
+                for sep in set().union(*map(format_separators, combined_datetime_formats))
+            }
+            for fmt in combined_datetime_formats:
+                candidates = unparsed.copy()
+                for sep in format_separators(fmt):
+                    candidates &= has_separator[sep]
+                if not candidates.any():
+                    continue
+                parsed = pd.to_datetime(combined[candidates], format=fmt, errors='coerce')
+                matched = parsed.notna()
+                if matched.any():
+                    result[parsed.index[matched]] = parsed[matched]
+                    pending[parsed.index[matched]] = False
+                    unparsed[np.flatnonzero(candidates)[matched.to_numpy()]] = False
+
+    # --- Порядковий запасний варіант лише для нерозпізнаних значень ---
+    if pending.any():
+        leftover = pd.DataFrame({date_col_name: date_col[pending]})
+        if has_time:
+            leftover[time_col_name] = time_col[pending]
+        fallback = leftover.apply(lambda row: combine_and_convert_datetime(row, date_col_name, time_col_name), axis=1)
+        result[fallback.index] = pd.to_datetime(fallback, errors='coerce')
+
+    result.index = df.index
+    return result
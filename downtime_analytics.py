@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# --- Простої: об'єднання інтервалів, MTTR, MTBF, доступність ---
+# Простій - інтервал від створення до виконання заявки типу "Простій".
+# Інтервали, що перекриваються на одному обладнанні (чи лінії), об'єднуються
+# одним проходом після сортування, тож час простою не рахується двічі.
+# Складність - O(n log n) через сортування.
+DOWNTIME_TYPES = ["Простій", "Простій РЦ"]
+START_COL = "Час створення (datetime)"
+END_COL = "Час виконання (datetime)"
+
+DOWNTIME_COL = "Простій (хв)"
+EPISODES_COL = "Кількість простоїв"
+REQUESTS_COL = "Заявок на простій"
+MTTR_COL = "MTTR (хв)"
+MTBF_COL = "MTBF (хв)"
+AVAILABILITY_COL = "Доступність (%)"
+
+_NS_PER_MINUTE = 60 * 10**9
+
+
+def merge_intervals(groups, starts, ends):
+    """Об'єднує інтервали, що перекриваються або стикуються, окремо в кожній групі.
+
+    Повертає масиви (група, початок, кінець) об'єднаних інтервалів,
+    відсортовані за групою та початком.
+    """
+    groups, starts, ends = np.asarray(groups), np.asarray(starts), np.asarray(ends)
+    if not len(starts):
+        return groups[:0], starts[:0], ends[:0]
+    order = np.lexsort((starts, groups))
+    groups, starts, ends = groups[order], starts[order], ends[order]
+    # Найпізніший кінець серед попередніх інтервалів групи
+    running_end = pd.Series(ends).groupby(groups).cummax().to_numpy()
+    opens = np.ones(len(starts), dtype=bool)
+    opens[1:] = (groups[1:] != groups[:-1]) | (starts[1:] > running_end[:-1])
+    first = np.flatnonzero(opens)
+    return groups[first], starts[first], np.maximum.reduceat(ends, first)
+
+
+def downtime_requests(df, types=DOWNTIME_TYPES):
+    """Заявки на простій із коректним інтервалом (виконання пізніше створення)."""
+    mask = df[END_COL].notna() & (df[END_COL] > df[START_COL])
+    if "Тип заявки" in df.columns:
+        mask &= df["Тип заявки"].isin(types)
+    return df[mask]
+
+
+def downtime_stats(df, by, period_start, period_end, types=DOWNTIME_TYPES):
+    """Простій, MTTR, MTBF і доступність для кожного значення стовпця `by` за період.
+
+    `df` - заявки без дублів; період - [period_start, period_end), інтервали
+    обрізаються його межами. MTTR - середня тривалість об'єднаного простою,
+    MTBF - середній час роботи між простоями.
+    """
+    period_start, period_end = pd.Timestamp(period_start), pd.Timestamp(period_end)
+    requests = downtime_requests(df, types)
+    requests = requests[requests[by].notna()]
+    starts = np.maximum(requests[START_COL].to_numpy(dtype="datetime64[ns]"), period_start.to_datetime64()).astype(np.int64)
+    ends = np.minimum(requests[END_COL].to_numpy(dtype="datetime64[ns]"), period_end.to_datetime64()).astype(np.int64)
+    inside = ends > starts
+    codes, names = pd.factorize(requests[by])
+    codes, starts, ends = codes[inside], starts[inside], ends[inside]
+
+    groups, merged_starts, merged_ends = merge_intervals(codes, starts, ends)
+    downtime = np.bincount(groups, weights=(merged_ends - merged_starts) / _NS_PER_MINUTE, minlength=len(names))
+    episodes = np.bincount(groups, minlength=len(names))
+    period_minutes = (period_end - period_start).total_seconds() / 60
+    stats = pd.DataFrame({
+        DOWNTIME_COL: downtime,
+        EPISODES_COL: episodes,
+        REQUESTS_COL: np.bincount(codes, minlength=len(names)),
+    }, index=pd.Index(names, name=by))
+    stats = stats[stats[EPISODES_COL] > 0]
+    stats[MTTR_COL] = stats[DOWNTIME_COL] / stats[EPISODES_COL]
+    stats[MTBF_COL] = (period_minutes - stats[DOWNTIME_COL]) / stats[EPISODES_COL]
+    stats[AVAILABILITY_COL] = 100 * (period_minutes - stats[DOWNTIME_COL]) / period_minutes
+    return stats.sort_values(DOWNTIME_COL, ascending=False)
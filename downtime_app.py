@@ -1,8 +1,27 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
+import pandas as pd
 import plotly.express as px
-from io import StringIO, BytesIO
+from uuid import uuid4
+
+from comments_store import comment_changes, load_comments, merge_comments, save_comments
+from csv_loader import describe_detection
+from downtime_analytics import AVAILABILITY_COL, DOWNTIME_COL, MTBF_COL, MTTR_COL, downtime_stats
+from export_writer import EXPORT_FORMATS, ESTIMATE_SAMPLE_ROWS, describe_estimate, estimate_export, write_export
+from filter_engine import FilterEngine
+from fuzzy_repeats import DEFAULT_SIMILARITY_THRESHOLD, FUZZY_FLAG_COL, build_fuzzy_index, fuzzy_flags_for_rows
+from history_store import (
+    HistoryUnavailableError, append_upload, list_uploads, load_history, remove_upload, store_version,
+)
+from instrumentation import DIAGNOSTICS_LOG, Instrumentation
+from low_memory import MEMORY_BUDGET_MB, compact_frame, describe_memory, frame_memory_mb, session_memory_mb
+from pipeline import REPORT_COLUMNS, downtime_by_equipment, summary_metrics, unique_tasks
+from preparation import DatasetError, DatasetLoadError, file_content_hash, has_synthetic_ids, load_and_prepare
+from rollup_cube import (
+    COUNT_COL, DAY_COL, build_rollup_cube, count_col, cube_totals, measure_mean, rollup, slice_cube, sum_col, top_n_with_other,
+)
+from search_index import build_search_index, search_mask
+from services_index import build_services_index, explode_services, service_totals, services_mask
 
 st.set_page_config(layout="wide", page_title="Аналіз заявок по обладнанню", page_icon="⚙️")
 
@@ -12,11 +31,16 @@ st.markdown("""
     Завантажте ваш **CSV-файл** з даними про заявки.
     
     **Особливості:**
-    * **Пошук**: Використовуйте поле пошуку, щоб швидко знайти заявки за ідентифікатором або описом робіт.
-    * **Єдина таблиця**: Ви бачите всі візуальні позначки (проблемний час, аномалії) в одній таблиці, де також можете додавати коментарі.
-    * **Завантаження змін**: Тепер є дві кнопки для завантаження:
-        1. **Оновлений Excel**: Завантажує повну таблицю з усіма вашими змінами.
-        2. **Звіт по коментарях**: Завантажує файл лише з тими заявками, до яких ви додали коментарі.
+    * **Пошук**: Використовуйте поле пошуку, щоб швидко знайти заявки за ідентифікатором або описом робіт. Текст запиту шукається буквально, тож дужки чи інші спеціальні символи не спричиняють помилок.
+    * **Історія заявок**: За бажанням нові та змінені заявки з кожного файлу додаються до сховища (без дублікатів за ідентифікатором), тож аналіз охоплює всю історію без повторного завантаження старих файлів. Файл можна вилучити з історії.
+    * **Схожі повторення**: За бажанням повтором вважається і заявка зі схожим, а не лише дослівно однаковим описом робіт; поріг схожості налаштовується.
+    * **Простої**: Загальний час простою враховує перекриття заявок на одному обладнанні лише один раз; для обладнання та ліній показано MTTR, MTBF і доступність.
+    * **Єдина таблиця**: Ви бачите всі візуальні позначки (проблемний час, аномалії) в одній таблиці, де також можете додавати коментарі. Таблиця показується посторінково, а коментарі зберігаються за ідентифікатором заявки і не зникають при зміні фільтрів.
+    * **Завантаження змін**: Файл формується лише на ваш запит, у форматі Excel, CSV або Parquet; перед формуванням показано орієнтовний розмір і час:
+        1. **Оновлена таблиця**: Повна відфільтрована таблиця з усіма вашими коментарями.
+        2. **Звіт по коментарях**: Лише ті заявки, до яких ви додали коментарі.
+    * **Економія пам'яті**: За бажанням повторювані текстові значення зберігаються як категорії, а набір даних - один для всіх сесій; якщо сесія перевищує бюджет пам'яті, показується попередження.
+    * **Діагностика**: За бажанням для кожного етапу обробки показано час, пікову пам'ять і кількість рядків; запуски записуються в журнал для порівняння.
     
     **Очікувані стовпці**:
     * "Дата створення" та "Час створення" (обов'язкові)
@@ -24,243 +48,370 @@ st.markdown("""
     * А також: "Тип заявки", "Цех", "Лінія", "Обладнання", "Ідентифікатор", "Опис робіт", "Відповідальні служби".
 """)
 
+# --- Кешований етап підготовки даних ---
+# Ключ кешу - хеш вмісту файлу, тому взаємодія з віджетами не запускає повторне
+# читання та обробку. Кількість записів обмежена, старі записи витісняються.
+PREPARED_CACHE_MAX_ENTRIES = 8
+# Варіанти кількості рядків на сторінці таблиці заявок
+TABLE_PAGE_SIZES = [50, 100, 200, 500]
+# Скільки обладнання показувати на графіках окремо, і з якої кількості днів календар малюється через WebGL
+CHART_TOP_N = 30
+CHART_WEBGL_THRESHOLD = 1000
+
+
+@st.cache_data(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Обробка файлу...")
+def load_prepared_dataset(file_hash, file_name, _file_bytes):
+    # Час кроків підготовки зберігається разом із результатом, щоб показати його й для кешованого файлу
+    load_probe = Instrumentation(trace_memory=False)
+    df, messages, detection = load_and_prepare(_file_bytes, file_name, probe=load_probe)
+    return df, messages, detection, load_probe.stages
+
+
+# Ключ кешу - версія сховища, тому історія перечитується лише після додавання нових заявок
+@st.cache_data(max_entries=2, show_spinner="⏳ Завантаження історії заявок...")
+def load_prepared_history(version):
+    return load_history()
+
+
+# У режимі економії пам'яті стиснутий набір даних один для всіх сесій і не
+# копіюється при кожному перезапуску скрипта, тому його не можна змінювати на місці
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Обробка файлу...")
+def load_compact_dataset(file_hash, file_name, _file_bytes):
+    load_probe = Instrumentation(trace_memory=False)
+    df, messages, detection = load_and_prepare(_file_bytes, file_name, probe=load_probe)
+    return (None if df is None else compact_frame(df)), messages, detection, load_probe.stages
+
+
+@st.cache_resource(max_entries=2, show_spinner="⏳ Завантаження історії заявок...")
+def load_compact_history(version):
+    df = load_history()
+    return None if df is None else compact_frame(df)
+
+
+# Набір даних, що перевищив бюджет, стискається з уже підготовленого датафрейму,
+# без повторного читання й розбору файлу
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Стиснення набору даних...")
+def load_compacted(dataset_key, _df):
+    return compact_frame(_df)
+
+
+# Розмір набору даних у пам'яті рахується один раз (для стиснутого й звичайного окремо)
+@st.cache_data(max_entries=PREPARED_CACHE_MAX_ENTRIES * 2)
+def load_dataset_memory(dataset_key, compact, _df):
+    return frame_memory_mb(_df)
+
+
+# Індекс MinHash будується один раз на набір даних і не копіюється кешем;
+# прапорці схожих повторень кешуються окремо для кожного порогу схожості
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Побудова індексу схожості описів...")
+def load_fuzzy_index(dataset_key, _df):
+    return build_fuzzy_index(_df)
+
+
+@st.cache_data(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Пошук схожих повторень...")
+def load_fuzzy_flags(dataset_key, threshold, _df):
+    return fuzzy_flags_for_rows(_df, threshold, fuzzy_index=load_fuzzy_index(dataset_key, _df)).to_numpy()
+
+
+# Коди категорій для фільтрів і кеш масок - один рушій на набір даних
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES)
+def load_filter_engine(dataset_key, _df):
+    return FilterEngine(_df)
+
+
+# Індекс триграм для пошуку будується при першому запиті і далі використовується повторно
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Побудова пошукового індексу...")
+def load_search_index(dataset_key, _df):
+    return build_search_index(_df)
+
+
+# Стовпець служб розбирається один раз на набір даних
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES)
+def load_services_index(dataset_key, _services):
+    return build_services_index(_services)
+
+
+# Куб показників будується один раз на набір даних; якщо ідентифікатори
+# повторюються, унікальні заявки залежать від фільтрів, і куб не використовується
+@st.cache_resource(max_entries=PREPARED_CACHE_MAX_ENTRIES, show_spinner="⏳ Підготовка показників...")
+def load_rollup_cube(dataset_key, _df):
+    if not _df["Ідентифікатор"].is_unique:
+        return None
+    return build_rollup_cube(_df)
+
+
+# Оцінка розміру й часу експорту за пробною вибіркою - одна на набір даних, формат і кількість рядків
+@st.cache_data(max_entries=PREPARED_CACHE_MAX_ENTRIES * 4)
+def load_export_estimate(dataset_key, export_format, total_rows, _sample_df):
+    return estimate_export(_sample_df, total_rows, export_format)
+
+
 # --- Вибір джерела даних (тільки завантаження файлу з комп'ютера) ---
 st.sidebar.header("Джерело даних")
+use_history = st.sidebar.checkbox(
+    "🗄️ Накопичувати історію заявок",
+    value=False,
+    help="Нові та змінені заявки з кожного завантаженого файлу зберігаються у сховищі на сервері, а аналіз виконується по всій історії. "
+         "Сховище спільне для всіх користувачів цього сервера. Потрібен стовпець 'Ідентифікатор'."
+)
+diagnostics_enabled = st.sidebar.checkbox(
+    "🩺 Діагностика продуктивності",
+    value=False,
+    help="Вимірювати час, пікову пам'ять і кількість рядків кожного етапу обробки. "
+         "Результати показуються внизу бічної панелі та дописуються в журнал на сервері."
+)
+probe = Instrumentation(enabled=diagnostics_enabled)
+low_memory = st.sidebar.checkbox(
+    "🪶 Економія пам'яті",
+    value=False,
+    help="Повторювані текстові значення зберігаються як категорії, цілі числа - у менших типах, а підготовлений "
+         f"набір даних спільний для всіх сесій. Вмикається автоматично, якщо набір даних перевищує бюджет {MEMORY_BUDGET_MB:.0f} МБ на сесію."
+)
+if "uploader_key" not in st.session_state:
+    st.session_state["uploader_key"] = 0
+if "diagnostics_session" not in st.session_state:
+    st.session_state["diagnostics_session"] = uuid4().hex[:12]
+
+
+def show_diagnostics():
+    """Панель діагностики в бічній панелі та запис запуску в журнал (якщо діагностику увімкнено)."""
+    if not probe.enabled:
+        return
+    probe.finish({
+        "session": st.session_state["diagnostics_session"],
+        "file": uploaded_file.name if uploaded_file else None,
+        "dataset": dataset_key,
+        "rows": len(df) if df is not None else 0,
+    })
+    with st.sidebar.expander("🩺 Діагностика", expanded=True):
+        diagnostics_table = probe.table()
+        st.dataframe(diagnostics_table, hide_index=True, use_container_width=True)
+        substages_note = (
+            "Складові (↳) підготовки файлу виміряно під час його першої обробки, без пам'яті. "
+            if any(record.get("parent") for record in probe.stages) else ""
+        )
+        st.caption(f"Усього: {probe.total_seconds():.2f} с. {substages_note}Журнал: {DIAGNOSTICS_LOG}")
+
+
+if use_history:
+    stored_uploads = list_uploads()
+    if stored_uploads:
+        with st.sidebar.expander(f"Файли в історії ({len(stored_uploads)})"):
+            upload_labels = {
+                upload_hash: f"{entry.get('name') or upload_hash[:12]} ({entry.get('uploaded_at', 'дата невідома')})"
+                for upload_hash, entry in stored_uploads.items()
+            }
+            upload_to_remove = st.selectbox("Файл", list(upload_labels), format_func=upload_labels.get)
+            if st.button("🗑️ Вилучити з історії"):
+                remove_upload(upload_to_remove)
+                # Новий ключ очищає поле завантаження, щоб вилучений файл не було додано знову
+                st.session_state["uploader_key"] += 1
+                st.rerun()
 df = None
-uploaded_file = st.file_uploader("📂 Завантажте CSV-файл", type=["csv"])
+dataset_key = None
+preparation_messages = []
+csv_detection = None
+uploaded_file = st.file_uploader("📂 Завантажте CSV-файл", type=["csv"], key=f"uploader-{st.session_state['uploader_key']}")
 
 if uploaded_file:
+    file_bytes = uploaded_file.getvalue()
+    file_hash = file_content_hash(file_bytes)
     try:
-        uploaded_file.seek(0)
-        
-        # Перевірка типу файлу за розширенням
-        if uploaded_file.name.endswith('.csv'):
+        history_loaded = False
+        if use_history:
             try:
-                df = pd.read_csv(uploaded_file, sep=';', encoding='utf-8')
-            except Exception:
-                uploaded_file.seek(0)
-                df = pd.read_csv(uploaded_file, sep=';', encoding='cp1251')
-            
-            if df.empty or len(df.columns) <= 2:
-                uploaded_file.seek(0)
-                try:
-                    df = pd.read_csv(uploaded_file, sep=',', encoding='utf-8')
-                except Exception:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, sep=',', encoding='cp1251')
-            
-            if df.empty or len(df.columns) <= 2:
-                uploaded_file.seek(0)
-                try:
-                    df = pd.read_csv(uploaded_file, encoding='utf-8-sig')
-                except Exception:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, encoding='cp1251')
-        
+                # Кроки додавання записуються окремими етапами; нове завантаження історії - наступним
+                preparation_messages, csv_detection = append_upload(
+                    file_bytes, file_hash, file_name=uploaded_file.name, probe=probe
+                )
+                with probe.stage("Завантаження історії") as stage:
+                    history_version = store_version()
+                    df = (load_compact_history if low_memory else load_prepared_history)(history_version)
+                    stage["rows_out"] = len(df) if df is not None else 0
+                dataset_key = f"history-{history_version}"
+                history_loaded = True
+            except HistoryUnavailableError as e:
+                st.warning(str(e))
+        if not history_loaded:
+            with probe.stage("Завантаження та підготовка файлу") as stage:
+                df, preparation_messages, csv_detection, preparation_stages = (
+                    load_compact_dataset if low_memory else load_prepared_dataset
+                )(file_hash, uploaded_file.name, file_bytes)
+                stage["rows_out"] = len(df) if df is not None else 0
+            probe.add_substages("Завантаження та підготовка файлу", preparation_stages)
+            dataset_key = file_hash
         st.success("✅ Файл успішно завантажено!")
-    except Exception as e:
+        if csv_detection is not None:
+            st.sidebar.caption(describe_detection(csv_detection))
+    except DatasetLoadError as e:
         st.error(f"❌ Виникла помилка під час завантаження файлу: {e}")
         st.info("Будь ласка, перевірте, чи файл не пошкоджений та чи є у ньому дані.")
         df = None
+    except DatasetError as e:
+        st.success("✅ Файл успішно завантажено!")
+        getattr(st, e.level)(str(e))
+        show_diagnostics()
+        st.stop()
+    except Exception as e:
+        st.success("✅ Файл успішно завантажено!")
+        st.error(f"❌ Виникла помилка під час обробки файлу: {e}")
+        st.info(f"Деталі помилки: {type(e).__name__}: {e}")
+        st.info("Будь ласка, перевірте ваш файл. Можливо, деякі стовпці відсутні або дані мають неочікуваний формат.")
+        show_diagnostics()
+        st.stop()
+elif use_history:
+    with probe.stage("Завантаження історії") as stage:
+        history_version = store_version()
+        df = (load_compact_history if low_memory else load_prepared_history)(history_version)
+        stage["rows_out"] = len(df) if df is not None else 0
+    dataset_key = f"history-{history_version}"
+    if df is not None:
+        st.info(f"ℹ️ Показано збережену історію заявок: {len(df)} рядків.")
+
+# --- Бюджет пам'яті: якщо вже власна копія набору даних більша за бюджет сесії, дані стискаються ---
+if df is not None and not df.empty and not low_memory and load_dataset_memory(dataset_key, False, df) > MEMORY_BUDGET_MB:
+    low_memory = True
+    st.warning(
+        f"⚠️ Набір даних займає більше {MEMORY_BUDGET_MB:.0f} МБ пам'яті, тому для нього автоматично увімкнено режим економії пам'яті."
+    )
+    with probe.stage("Стиснення набору даних", rows_in=len(df)) as stage:
+        df = load_compacted(dataset_key, df)
+        stage["rows_out"] = len(df)
 
 # --- Вся подальша логіка обробки даних тепер виконується тільки якщо df не порожній ---
 if df is not None and not df.empty:
     try:
-        critical_date_time_cols = ["Дата створення", "Час створення"]
-        for col in critical_date_time_cols:
-            if col not in df.columns:
-                st.error(f"❌ У файлі відсутній критично важливий стовпець: '{col}'. Будь ласка, перевірте ваш файл.")
-                st.stop()
-
-        if "Звіт про виконану роботу" not in df.columns:
-            df["Звіт про виконану роботу"] = ""
-            st.info("ℹ️ Стовпець 'Звіт про виконану роботу' відсутній у файлі і був доданий як порожній.")
-        if "Реакція на заявки" not in df.columns:
-            df["Реакція на заявки"] = ""
-            st.info("ℹ️ Додано новий стовпець 'Реакція на заявки' для коментарів.")
-        if "Ідентифікатор" not in df.columns:
-            df["Ідентифікатор"] = df.index + 1
-            st.info("ℹ️ Стовпець 'Ідентифікатор' відсутній у файлі і був доданий.")
-        if "Обладнання" not in df.columns:
-            df["Обладнання"] = "Не вказано"
-            st.info("ℹ️ Стовпець 'Обладнання' відсутній у файлі і був доданий зі значенням 'Не вказано'.")
-        if "Опис робіт" not in df.columns:
-            df["Опис робіт"] = "Без опису"
-            st.info("ℹ️ Стовпець 'Опис робіт' відсутній у файлі і був доданий зі значенням 'Без опису'.")
-        if "Відповідальні служби" not in df.columns:
-            df["Відповідальні служби"] = "Не вказано"
-            st.info("ℹ️ Стовпець 'Відповідальні служби' відсутній у файлі і був доданий зі значенням 'Не вказано'.")
-        
-        date_formats = ["%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
-        time_formats = ["%H:%M:%S", "%H:%M"]
-        combined_datetime_formats = [f"{d_fmt} {t_fmt}" for d_fmt in date_formats for t_fmt in time_formats]
-        combined_datetime_formats = [
-            "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M:%S",
-            "%d.%m.%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M",
-            "%Y-%m-%dT%H:%M:%S"
-        ] + combined_datetime_formats
-        combined_datetime_formats.extend(date_formats)
-        combined_datetime_formats = list(dict.fromkeys(combined_datetime_formats))
-
-        def combine_and_convert_datetime(row, date_col_name, time_col_name=None):
-            date_val = row.get(date_col_name)
-            time_val = row.get(time_col_name) if time_col_name else None
-            if pd.isna(date_val) and (time_col_name is None or pd.isna(time_val)):
-                return np.nan
-            try:
-                if pd.api.types.is_numeric_dtype(type(date_val)) and pd.notna(date_val):
-                    base_date = pd.to_datetime('1899-12-30')
-                    converted_date = base_date + pd.to_timedelta(date_val, unit='D')
-                    if pd.notna(converted_date):
-                        if time_col_name and pd.api.types.is_numeric_dtype(type(time_val)) and pd.notna(time_val):
-                            converted_time = pd.to_timedelta(time_val, unit='D')
-                            return converted_date + converted_time
-                        return converted_date
-            except Exception:
-                pass
-            date_str = str(date_val).strip() if pd.notna(date_val) else ""
-            time_str = str(time_val).strip() if pd.notna(time_val) else ""
-            combined_str = f"{date_str} {time_str}" if date_str and time_str else date_str or time_str
-            if not combined_str:
-                return np.nan
-            for fmt in combined_datetime_formats:
-                try:
-                    return pd.to_datetime(combined_str, format=fmt)
-                except (ValueError, TypeError):
-                    continue
-            try:
-                return pd.to_datetime(combined_str, infer_datetime_format=True, errors='coerce')
-            except (ValueError, TypeError):
-                return np.nan
-
-        df['Час створення (datetime)'] = df.apply(lambda row: combine_and_convert_datetime(row, 'Дата створення', 'Час створення'), axis=1)
-        initial_rows = len(df)
-        df.dropna(subset=["Час створення (datetime)"], inplace=True)
-        if len(df) < initial_rows:
-            st.warning(f"⚠️ Видалено {initial_rows - len(df)} рядків через некоректний 'Час створення'.")
-        if df.empty:
-            st.warning("⚠️ Після обробки дат у файлі не залишилося дійсних даних.")
-            st.stop()
-        
-        df_for_anomaly_detection = df.drop_duplicates(subset=['Ідентифікатор']).copy()
-        
-        if "Обладнання" in df_for_anomaly_detection.columns and "Опис робіт" in df_for_anomaly_detection.columns and "Час створення (datetime)" in df_for_anomaly_detection.columns:
-            df_for_anomaly_detection['problem_location'] = df_for_anomaly_detection['Обладнання'].fillna(df_for_anomaly_detection['Лінія'].fillna('Невідоме обладнання')).astype(str)
-            df_for_anomaly_detection['problem_description'] = df_for_anomaly_detection['Опис робіт'].fillna('Без опису робіт').astype(str)
-            df_for_anomaly_detection['problem_key'] = df_for_anomaly_detection['problem_location'] + " ### " + df_for_anomaly_detection['problem_description']
-            df_for_anomaly_detection = df_for_anomaly_detection.sort_values(by=['problem_key', 'Час створення (datetime)'])
-            df_for_anomaly_detection['time_diff'] = df_for_anomaly_detection.groupby('problem_key')['Час створення (datetime)'].diff()
-            anomaly_min_delta = pd.Timedelta(days=0, minutes=1)
-            anomaly_max_delta = pd.Timedelta(days=3)
-            df_for_anomaly_detection['Підозріле повторення'] = (
-                (df_for_anomaly_detection['time_diff'] > anomaly_min_delta) & 
-                (df_for_anomaly_detection['time_diff'] <= anomaly_max_delta)
-            )
-            anomaly_flags = df_for_anomaly_detection[['Ідентифікатор', 'Підозріле повторення']].copy()
-            anomaly_flags = anomaly_flags.drop_duplicates(subset='Ідентифікатор', keep='first')
-            df = df.merge(anomaly_flags, on='Ідентифікатор', how='left')
-            df['Підозріле повторення'] = df['Підозріле повторення'].fillna(False)
-        else:
-            st.warning("⚠️ Неможливо виконати аналіз аномалій.")
-            df['Підозріле повторення'] = False
-
-        df['Час виконання (datetime)'] = df.apply(lambda row: combine_and_convert_datetime(row, 'Дата виконання', 'Час виконання'), axis=1)
-        df['Час закриття (datetime)'] = df.apply(lambda row: combine_and_convert_datetime(row, 'Дата закриття', 'Час закриття'), axis=1)
-        df["Дата створення (для фільтра)"] = df["Час створення (datetime)"].dt.date
-        df["Час до виконання (хв)"] = (df["Час виконання (datetime)"] - df["Час створення (datetime)"]).dt.total_seconds() / 60
-        df["Час до закриття (хв)"] = (df["Час закриття (datetime)"] - df["Час створення (datetime)"]).dt.total_seconds() / 60
+        for level, message in preparation_messages:
+            getattr(st, level)(message)
 
         # --- Бокова панель для фільтрів ---
         st.sidebar.header("🔍 Фільтри даних")
+        filter_engine = load_filter_engine(dataset_key, df)
         if "Тип заявки" in df.columns:
-            selected_types = st.sidebar.multiselect("Оберіть тип(и) заявки", sorted(df["Тип заявки"].dropna().unique().tolist()))
+            selected_types = st.sidebar.multiselect("Оберіть тип(и) заявки", filter_engine.options("Тип заявки"))
         else:
             selected_types = []
         
         if "Цех" in df.columns:
-            all_workshops = sorted(df["Цех"].dropna().unique().tolist())
+            all_workshops = filter_engine.options("Цех")
             selected_workshops = st.sidebar.multiselect("Оберіть цех(и)", all_workshops)
         else:
             selected_workshops = []
         
         if "Відповідальні служби" in df.columns:
-            temp_df_services = df.copy()
-            temp_df_services["Відповідальні служби"] = temp_df_services["Відповідальні служби"].fillna("")
-            temp_df_services["Відповідальні служби"] = temp_df_services["Відповідальні служби"].apply(
-                lambda x: [s.strip() for s in str(x).split(',') if s.strip()] if pd.notna(x) else ["Не вказано"]
-            )
-            all_services = sorted(list(set([item for sublist in temp_df_services["Відповідальні служби"] for item in sublist])))
-            selected_responsible_services = st.sidebar.multiselect("Оберіть відповідальну(і) службу(и)", all_services)
+            services_index = load_services_index(dataset_key, df["Відповідальні служби"])
+            selected_responsible_services = st.sidebar.multiselect("Оберіть відповідальну(і) службу(и)", services_index.services)
         else:
+            services_index = None
             selected_responsible_services = []
 
-        # --- Динамічний фільтр обладнання на основі вибраних цехів ---
+        # --- Динамічний фільтр обладнання на основі вибраних цехів (з готового відображення цех -> обладнання) ---
         if "Обладнання" in df.columns:
-            if selected_workshops:
-                available_equipment = sorted(df[df["Цех"].isin(selected_workshops)]["Обладнання"].dropna().unique().tolist())
-            else:
-                available_equipment = sorted(df["Обладнання"].dropna().unique().tolist())
+            available_equipment = filter_engine.equipment_options(selected_workshops)
             selected_equipment = st.sidebar.multiselect("Оберіть обладнання", available_equipment)
         else:
             selected_equipment = []
             
+        use_fuzzy_repeats = st.sidebar.checkbox(
+            "Шукати схожі повторення",
+            value=False,
+            help="Повтором також вважається заявка на тому ж місці, опис якої схожий, але не збігається дослівно "
+                 "(наприклад, «не працює насос» і «Насос не працює!»)."
+        )
+        if use_fuzzy_repeats:
+            similarity_threshold = st.sidebar.slider(
+                "Поріг схожості опису", min_value=0.5, max_value=1.0, value=DEFAULT_SIMILARITY_THRESHOLD, step=0.05
+            )
+            # Прапорці зберігаються окремим масивом: набір даних може бути спільним для всіх сесій
+            with probe.stage("Схожі повторення", rows_in=len(df)) as stage:
+                fuzzy_flags = load_fuzzy_flags(dataset_key, similarity_threshold, df)
+                stage["rows_out"] = int(fuzzy_flags.sum())
+        else:
+            similarity_threshold = None
+            fuzzy_flags = np.zeros(len(df), dtype=bool)
         filter_anomalies = st.sidebar.checkbox("Показати лише підозрілі повторення", value=False)
-        min_date_available = df["Дата створення (для фільтра)"].min()
-        max_date_available = df["Дата створення (для фільтра)"].max()
+        min_date_available, max_date_available = filter_engine.date_range()
         start_date = st.sidebar.date_input("Початкова дата", value=min_date_available, min_value=min_date_available, max_value=max_date_available)
         end_date = st.sidebar.date_input("Кінцева дата", value=max_date_available, min_value=min_date_available, max_value=max_date_available)
 
-        # --- Застосування фільтрів до основного датафрейму ---
-        filtered_df = df.copy()
-        if selected_types: filtered_df = filtered_df[filtered_df["Тип заявки"].isin(selected_types)]
-        if selected_workshops: filtered_df = filtered_df[filtered_df["Цех"].isin(selected_workshops)]
-        if selected_equipment: filtered_df = filtered_df[filtered_df["Обладнання"].isin(selected_equipment)]
-        if filter_anomalies: filtered_df = filtered_df[filtered_df['Підозріле повторення'] == True]
-        filtered_df = filtered_df[(filtered_df["Дата створення (для фільтра)"] >= start_date) & (filtered_df["Дата створення (для фільтра)"] <= end_date)]
-
-        # --- Фільтрація по службах до дублювання ---
-        if selected_responsible_services and "Відповідальні служби" in filtered_df.columns:
-            def has_selected_service(services_str):
-                if pd.isna(services_str):
-                    return False
-                services_list = [s.strip() for s in str(services_str).split(',') if s.strip()]
-                return any(s in selected_responsible_services for s in services_list)
-
-            filtered_df = filtered_df[filtered_df["Відповідальні служби"].apply(has_selected_service)]
+        # --- Застосування фільтрів: маска кожного фільтра кешується, рядки вибираються один раз ---
+        with probe.stage("Фільтрація", rows_in=len(df)) as stage:
+            filter_masks = [filter_engine.date_mask(start_date, end_date)]
+            if selected_types: filter_masks.append(filter_engine.category_mask("Тип заявки", selected_types))
+            if selected_workshops: filter_masks.append(filter_engine.category_mask("Цех", selected_workshops))
+            if selected_equipment: filter_masks.append(filter_engine.category_mask("Обладнання", selected_equipment))
+            if filter_anomalies:
+                filter_masks.append(filter_engine.cached_mask(
+                    "Підозріле повторення", similarity_threshold,
+                    lambda: df['Підозріле повторення'].to_numpy(dtype=bool) | fuzzy_flags
+                ))
+            # Фільтрація по службах до дублювання
+            if selected_responsible_services and services_index is not None:
+                filter_masks.append(filter_engine.cached_mask(
+                    "Відповідальні служби", tuple(sorted(selected_responsible_services)),
+                    lambda: services_mask(services_index, selected_responsible_services)
+                ))
+            filter_mask = filter_engine.combine(filter_masks)
+            filtered_df = df[filter_mask]
+            stage["rows_out"] = len(filtered_df)
 
         if filtered_df.empty:
             st.warning("⚠️ Після застосування вибраних фільтрів даних не знайдено.")
+            show_diagnostics()
             st.stop()
 
         # --- Створення унікального датафрейму для коректних розрахунків ---
-        unique_tasks_df = filtered_df.drop_duplicates(subset=['Ідентифікатор']).copy()
+        unique_tasks_df = unique_tasks(filtered_df)
 
-        # --- Пошук по заявках ---
+        # --- Пошук по заявках (текст запиту шукається буквально, за індексом триграм) ---
         search_query = st.text_input("🔍 Пошук по заявках (введіть ідентифікатор або опис робіт)", "")
+        col_search1, col_search2 = st.columns(2)
+        search_case_sensitive = col_search1.checkbox("Враховувати регістр", value=False)
+        search_normalize = col_search2.checkbox(
+            "Не розрізняти апострофи та кількість пробілів", value=False,
+            help="Наприклад, «м’ясо» знайдеться за запитом «м'ясо»."
+        )
         if search_query:
-            unique_tasks_df = unique_tasks_df[
-                unique_tasks_df['Ідентифікатор'].astype(str).str.contains(search_query, case=False, na=False) |
-                unique_tasks_df['Опис робіт'].astype(str).str.contains(search_query, case=False, na=False)
-            ]
+            with probe.stage("Пошук", rows_in=len(filtered_df)) as stage:
+                search_index = load_search_index(dataset_key, df)
+                matched = filter_engine.cached_mask(
+                    "Пошук", (search_query, search_case_sensitive, search_normalize),
+                    lambda: search_mask(search_index, search_query, search_case_sensitive, search_normalize)
+                )
+                unique_tasks_df = unique_tasks_df[matched[df.index.get_indexer(unique_tasks_df.index)]]
+                filtered_df = df[filter_mask & matched]
+                stage["rows_out"] = len(filtered_df)
             if unique_tasks_df.empty:
                 st.info("ℹ️ За вашим запитом нічого не знайдено.")
-            
-            filtered_df = filtered_df[
-                filtered_df['Ідентифікатор'].astype(str).str.contains(search_query, case=False, na=False) |
-                filtered_df['Опис робіт'].astype(str).str.contains(search_query, case=False, na=False)
-            ]
 
         # --- Обробка стовпця "Відповідальні служби" для відображення ---
-        if "Відповідальні служби" in filtered_df.columns:
-            filtered_df["Відповідальні служби"] = filtered_df["Відповідальні служби"].fillna("")
-            filtered_df["Відповідальні служби"] = filtered_df["Відповідальні служби"].apply(
-                lambda x: [s.strip() for s in str(x).split(',') if s.strip()] if pd.notna(x) else ["Не вказано"]
-            )
-            filtered_df = filtered_df.explode("Відповідальні служби")
+        # Рядок на кожну службу; за обраними службами лишаються тільки їхні рядки
+        if services_index is not None:
+            with probe.stage("Розділення служб", rows_in=len(filtered_df)) as stage:
+                filtered_df = explode_services(
+                    filtered_df, df.index.get_indexer(filtered_df.index), services_index, selected_responsible_services
+                )
+                stage["rows_out"] = len(filtered_df)
             st.info("ℹ️ Стовпець 'Відповідальні служби' було оброблено для розділення.")
-        
-        # --- Фільтрування після Explode ---
-        if selected_responsible_services: filtered_df = filtered_df[filtered_df["Відповідальні служби"].isin(selected_responsible_services)]
+
+        # --- Пам'ять сесії: власна копія набору даних (якщо він не спільний), вибірки рядків і файл експорту ---
+        prepared_export = st.session_state.get("export_file")
+        session_mb = session_memory_mb(
+            load_dataset_memory(dataset_key, low_memory, df), len(df),
+            [len(filtered_df)] + ([] if unique_tasks_df is filtered_df else [len(unique_tasks_df)]),
+            shared=low_memory, extra_bytes=len(prepared_export[1]) if prepared_export is not None else 0,
+        )
+        st.sidebar.caption(describe_memory(session_mb))
+        if session_mb > MEMORY_BUDGET_MB:
+            st.warning(
+                f"⚠️ Сесія займає близько {session_mb:.0f} МБ пам'яті при бюджеті {MEMORY_BUDGET_MB:.0f} МБ. "
+                + ("Звузьте фільтри, щоб зменшити кількість рядків." if low_memory
+                   else "Увімкніть режим економії пам'яті в бічній панелі або звузьте фільтри.")
+            )
+
+        # --- Визначення стовпців для відображення та редагування ---
+        columns_to_display = ["Статус"] + REPORT_COLUMNS
+        filtered_columns_to_display = [col for col in columns_to_display if col in filtered_df.columns or col == "Статус"]
 
         # --- Створення нового стовпця з візуальними позначками ---
         def get_visual_status(row):
@@ -269,95 +420,149 @@ if df is not None and not df.empty:
                 statuses.append("🔴 >15 хв")
             if row['Підозріле повторення']:
                 statuses.append("⚠️ Повтор")
+            if row[FUZZY_FLAG_COL]:
+                statuses.append("≈ Схожий повтор")
             return ", ".join(statuses) if statuses else ""
 
-        filtered_df['Статус'] = filtered_df.apply(get_visual_status, axis=1)
-
-        # --- Визначення стовпців для відображення та редагування ---
-        columns_to_display = [
-            "Статус", "Ідентифікатор", "Дата створення", "Час створення", "Тип заявки", "Цех", 
-            "Лінія", "Обладнання", "Опис робіт", "Відповідальні служби", 
-            "Час до виконання (хв)", "Час до закриття (хв)", "Звіт про виконану роботу",
-            "Реакція на заявки"
-        ]
-        filtered_columns_to_display = [col for col in columns_to_display if col in filtered_df.columns]
-
-        # --- Єдина таблиця для редагування та перегляду ---
+        # --- Єдина таблиця для редагування та перегляду (посторінково) ---
+        # У браузер передається лише поточна сторінка, тож час показу не залежить
+        # від розміру даних; коментарі одразу записуються в окреме сховище
         st.subheader("📋 Таблиця заявок")
-        st.markdown("Ви можете додати свої коментарі в стовпець **'Реакція на заявки'**.")
-        
-        editable_df = st.data_editor(
-            filtered_df[filtered_columns_to_display].copy(),
-            use_container_width=True, 
-            hide_index=True,
-            column_config={
-                "Реакція на заявки": st.column_config.TextColumn("Реакція на заявки"),
-                "Статус": st.column_config.TextColumn("Статус", disabled=True),
-                "Час до виконання (хв)": st.column_config.NumberColumn("Час до виконання (хв)", format="%.1f", disabled=True),
-                "Час до закриття (хв)": st.column_config.NumberColumn("Час до закриття (хв)", format="%.1f", disabled=True),
-            },
-            disabled=[col for col in filtered_columns_to_display if col not in ["Реакція на заявки"]]
-        )
+        st.markdown("Ви можете додати свої коментарі в стовпець **'Реакція на заявки'**. Коментарі зберігаються і не зникають при зміні фільтрів.")
+        # Сховище коментарів спільне для всіх файлів, тому номери рядків замість ідентифікаторів у нього не потрапляють
+        comments_persisted = not has_synthetic_ids(df)
+        stored_comments = load_comments() if comments_persisted else {}
+
+        col_page1, col_page2, col_page3 = st.columns([1, 1, 2])
+        page_size = col_page1.selectbox("Рядків на сторінці", TABLE_PAGE_SIZES, index=1)
+        page_count = max(1, -(-len(filtered_df) // page_size))
+        # Ключ залежить від кількості сторінок, тож після зміни фільтрів показується перша сторінка
+        page_number = col_page2.number_input("Сторінка", min_value=1, max_value=page_count, value=1, step=1, key=f"table-page-{page_count}")
+        page_start = (page_number - 1) * page_size
+        page_end = min(page_start + page_size, len(filtered_df))
+        if page_end > page_start:
+            col_page3.caption(f"Рядки {page_start + 1}–{page_end} з {len(filtered_df)} (сторінка {page_number} з {page_count})")
+
+        with probe.stage("Таблиця (сторінка)", rows_in=len(filtered_df)) as stage:
+            page_df = merge_comments(filtered_df.iloc[page_start:page_end], stored_comments)
+            page_df[FUZZY_FLAG_COL] = fuzzy_flags[df.index.get_indexer(page_df.index)]
+            page_df['Статус'] = page_df.apply(get_visual_status, axis=1)
+            page_df = page_df[filtered_columns_to_display]
+            # Окремий стан редактора для кожного набору рядків, щоб правки однієї сторінки не переносилися на іншу
+            editor_key = f"table-{page_start}-{pd.util.hash_pandas_object(filtered_df.index[page_start:page_end].to_series(), index=False).sum()}"
+            edited_page_df = st.data_editor(
+                page_df,
+                use_container_width=True, 
+                hide_index=True,
+                column_config={
+                    "Реакція на заявки": st.column_config.TextColumn("Реакція на заявки"),
+                    "Статус": st.column_config.TextColumn("Статус", disabled=True),
+                    "Час до виконання (хв)": st.column_config.NumberColumn("Час до виконання (хв)", format="%.1f", disabled=True),
+                    "Час до закриття (хв)": st.column_config.NumberColumn("Час до закриття (хв)", format="%.1f", disabled=True),
+                },
+                disabled=[col for col in filtered_columns_to_display if col not in ["Реакція на заявки"]],
+                key=editor_key,
+            )
+            stage["rows_out"] = len(page_df)
+        if comments_persisted:
+            changed_comments = comment_changes(page_df, edited_page_df)
+            if changed_comments:
+                try:
+                    save_comments(changed_comments)
+                except DatasetError as e:
+                    getattr(st, e.level)(str(e))
+        else:
+            st.info("ℹ️ У файлі немає стовпця 'Ідентифікатор', тому коментарі не зберігаються між змінами фільтрів.")
 
         st.markdown("---")
 
-        # --- Кнопки завантаження ---
-        col1, col2 = st.columns(2)
-
-        @st.cache_data
-        def convert_df_to_excel(df_to_convert):
-            df_to_convert = df_to_convert.drop(columns=['Статус'], errors='ignore')
-            
-            if 'Реакція на заявки' not in df_to_convert.columns:
-                df_to_convert['Реакція на заявки'] = ''
-            
-            output = BytesIO()
-            df_to_convert.to_excel(output, index=False, engine='openpyxl')
-            processed_data = output.getvalue()
-            return processed_data
-
-        with col1:
+        # --- Експорт таблиці (файл формується лише на запит) ---
+        st.subheader("⬇️ Завантаження таблиці")
+        col_export1, col_export2 = st.columns(2)
+        export_format = col_export1.selectbox(
+            "Формат файлу", list(EXPORT_FORMATS), format_func=lambda key: EXPORT_FORMATS[key].label,
+            help="CSV і Parquet формуються значно швидше за Excel і займають менше місця."
+        )
+        export_scope = col_export2.radio(
+            "Що завантажити", ["Оновлена таблиця", "Звіт по коментарях"], horizontal=True,
+            help="Звіт по коментарях містить лише заявки, до яких додано коментарі."
+        )
+        export_columns = [col for col in filtered_columns_to_display if col != "Статус"]
+        export_comments = load_comments() if comments_persisted else {}
+        # Ключ підготовленого файлу: після зміни фільтрів, формату чи коментарів файл слід сформувати заново
+        export_token = (
+            dataset_key, export_format, export_scope, len(filtered_df),
+            int(pd.util.hash_pandas_object(filtered_df.index.to_series(), index=False).sum()),
+            hash(frozenset(export_comments.items())),
+        )
+        if export_scope == "Оновлена таблиця":
+            export_size, export_seconds = load_export_estimate(
+                dataset_key, export_format, len(filtered_df), merge_comments(filtered_df.head(ESTIMATE_SAMPLE_ROWS), export_comments)[export_columns]
+            )
+            st.caption(f"{len(filtered_df)} рядків. {describe_estimate(export_size, export_seconds)}")
+        if st.button("⚙️ Сформувати файл"):
+            with st.spinner("⏳ Формування файлу..."), probe.stage(f"Експорт ({export_format})", rows_in=len(filtered_df)) as stage:
+                export_df = merge_comments(filtered_df, export_comments)[export_columns]
+                if export_scope == "Звіт по коментарях":
+                    export_df = export_df[export_df['Реакція на заявки'].str.strip() != '']
+                stage["rows_out"] = len(export_df)
+                if export_df.empty:
+                    st.session_state.pop("export_file", None)
+                    st.info("Щоб завантажити звіт, додайте коментарі хоча б до однієї заявки.")
+                else:
+                    st.session_state["export_file"] = (export_token, write_export(export_df, export_format))
+        prepared_export = st.session_state.get("export_file")
+        if prepared_export is not None and prepared_export[0] == export_token:
+            file_prefix = "оновлені_заявки" if export_scope == "Оновлена таблиця" else "звіт_по_коментарях"
             st.download_button(
-                label="⬇️ Завантажити оновлений Excel",
-                data=convert_df_to_excel(editable_df),
-                file_name=f'оновлені_заявки_{pd.Timestamp.now().strftime("%Y-%m-%d")}.xlsx',
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                help='Завантажити відфільтровану та відредаговану таблицю у форматі Excel'
+                label=f"⬇️ Завантажити {EXPORT_FORMATS[export_format].label}",
+                data=prepared_export[1],
+                file_name=f'{file_prefix}_{pd.Timestamp.now().strftime("%Y-%m-%d")}.{EXPORT_FORMATS[export_format].extension}',
+                mime=EXPORT_FORMATS[export_format].mime,
+                help='Завантажити відфільтровану таблицю зі збереженими коментарями'
             )
 
-        with col2:
-            commented_df = editable_df[editable_df['Реакція на заявки'].str.strip() != '']
-            if not commented_df.empty:
-                st.download_button(
-                    label="⬇️ Завантажити звіт по коментарях",
-                    data=convert_df_to_excel(commented_df),
-                    file_name=f'звіт_по_коментарях_{pd.Timestamp.now().strftime("%Y-%m-%d")}.xlsx',
-                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    help='Завантажити тільки ті заявки, до яких ви додали коментарі'
-                )
-            else:
-                st.info("Щоб завантажити звіт, додайте коментарі хоча б до однієї заявки.")
-
         st.markdown("---")
 
+        # --- Куб показників для календаря, метрик і графіків ---
+        # Якщо всі активні фільтри є вимірами куба, показники беруться зі зрізу
+        # готового куба; пошук, служби та схожі повторення фільтрують окремі
+        # заявки, тоді куб будується лише по відфільтрованих заявках
+        with probe.stage("Куб показників", rows_in=len(unique_tasks_df)) as stage:
+            rollup_cells = load_rollup_cube(dataset_key, df)
+            if rollup_cells is None or search_query or selected_responsible_services or (filter_anomalies and use_fuzzy_repeats):
+                rollup_cells = build_rollup_cube(unique_tasks_df)
+            else:
+                rollup_cells = slice_cube(
+                    rollup_cells, start_date, end_date,
+                    {"Тип заявки": selected_types, "Цех": selected_workshops, "Обладнання": selected_equipment},
+                    anomalies_only=filter_anomalies,
+                )
+            rollup_totals = cube_totals(rollup_cells)
+            stage["rows_out"] = len(rollup_cells)
+
         # --- Новий розділ: Календар заявок ---
         st.subheader("🗓️ Календар заявок")
         st.markdown("Цей графік показує кількість унікальних заявок за кожен день.")
         
-        if "Дата створення (для фільтра)" in unique_tasks_df.columns:
-            calendar_data = unique_tasks_df.groupby("Дата створення (для фільтра)").size().reset_index(name='Кількість заявок')
+        if DAY_COL in rollup_cells.columns:
+            calendar_data = rollup(rollup_cells, DAY_COL)[COUNT_COL].sort_index().reset_index(name='Кількість заявок')
             
             if not calendar_data.empty:
-                fig_calendar = px.bar(
-                    calendar_data,
+                chart_kwargs = dict(
                     x="Дата створення (для фільтра)",
                     y="Кількість заявок",
                     title="Кількість заявок за датою",
                     labels={"Дата створення (для фільтра)": "Дата", "Кількість заявок": "Кількість"},
                     color_discrete_sequence=["#1f77b4"]
                 )
+                if len(calendar_data) > CHART_WEBGL_THRESHOLD:
+                    # Багаторічна історія: лінія з відмальовуванням через WebGL замість тисяч стовпців
+                    fig_calendar = px.line(calendar_data, render_mode="webgl", **chart_kwargs)
+                else:
+                    fig_calendar = px.bar(calendar_data, **chart_kwargs)
+                    fig_calendar.update_traces(marker_line_width=1.5, marker_line_color='rgb(8,48,107)')
                 fig_calendar.update_layout(xaxis_title="Дата створення", yaxis_title="Кількість заявок")
-                fig_calendar.update_traces(marker_line_width=1.5, marker_line_color='rgb(8,48,107)')
                 st.plotly_chart(fig_calendar, use_container_width=True)
             else:
                 st.info("Немає даних для побудови календаря за обраний період.")
@@ -366,52 +571,60 @@ if df is not None and not df.empty:
         
         st.markdown("---")
 
-        # --- Статистика (використовуємо унікальний датафрейм) ---
+        # --- Статистика (по унікальних заявках, з куба) ---
         st.subheader("📊 Аналіз даних")
         
+        # Простій - об'єднання інтервалів "створення -> виконання" заявок на простій
+        # на кожному обладнанні за обраний період, тож перекриття не рахуються двічі
+        downtime_period_start = pd.Timestamp(start_date)
+        downtime_period_end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        with probe.stage("Простої", rows_in=len(unique_tasks_df)) as stage:
+            equipment_downtime = downtime_by_equipment(unique_tasks_df, downtime_period_start, downtime_period_end)
+            stage["rows_out"] = 0 if equipment_downtime is None else len(equipment_downtime)
+        metrics = summary_metrics(rollup_cells, equipment_downtime)
+
         col_avg1, col_avg2 = st.columns(2)
-        avg_виконання = unique_tasks_df['Час до виконання (хв)'].dropna().mean()
-        avg_закриття = unique_tasks_df['Час до закриття (хв)'].dropna().mean()
-        col_avg1.metric("Середній час до виконання (хв)", f"{avg_виконання:.1f}" if pd.notna(avg_виконання) else "Немає даних")
-        col_avg2.metric("Середній час до закриття (хв)", f"{avg_закриття:.1f}" if pd.notna(avg_закриття) else "Немає даних")
+        col_avg1.metric("Середній час до виконання (хв)", f"{metrics.avg_execution:.1f}" if pd.notna(metrics.avg_execution) else "Немає даних")
+        col_avg2.metric("Середній час до закриття (хв)", f"{metrics.avg_closure:.1f}" if pd.notna(metrics.avg_closure) else "Немає даних")
         
         st.markdown("---")
         col_total1, col_total2 = st.columns(2) 
-        total_execution_time_minutes = unique_tasks_df["Час до виконання (хв)"].dropna().sum() if "Час до виконання (хв)" in unique_tasks_df.columns else 0.0
-        col_total1.metric("Загальний час до виконання (хв)", f"{total_execution_time_minutes:.1f}" if pd.notna(total_execution_time_minutes) else "Немає даних")
-
-        total_downtime_minutes = 0.0
-        downtime_types = ["Простій", "Простій РЦ"]
-        
-        # Оновлена логіка: розраховуємо час простою, тільки якщо відповідні типи вибрані
-        if "Тип заявки" in unique_tasks_df.columns and "Час до виконання (хв)" in unique_tasks_df.columns:
-            downtime_types_in_selection = [dtype for dtype in downtime_types if dtype in selected_types]
-            
-            if downtime_types_in_selection:
-                downtime_df = unique_tasks_df[unique_tasks_df["Тип заявки"].isin(downtime_types_in_selection)]
-                total_downtime_minutes = downtime_df["Час до виконання (хв)"].dropna().sum()
-
-        col_total2.metric("Загальний час простою (хв)", f"{total_downtime_minutes:.1f}" if pd.notna(total_downtime_minutes) else "Немає даних")
+        col_total1.metric("Загальний час до виконання (хв)", f"{metrics.total_execution:.1f}" if pd.notna(metrics.total_execution) else "Немає даних")
+        col_total2.metric(
+            "Загальний час простою (хв)", f"{metrics.total_downtime:.1f}" if pd.notna(metrics.total_downtime) else "Немає даних",
+            help="Заявки типу «Простій» та «Простій РЦ», що перекриваються в часі на одному обладнанні, враховуються один раз."
+        )
 
         st.markdown("---")
 
         st.subheader("⚙️ Аналіз часу на машину")
-        if "Обладнання" in unique_tasks_df.columns and not unique_tasks_df["Обладнання"].empty:
+        if "Обладнання" in rollup_cells.columns and not rollup_cells.empty:
+            equipment_rollup = rollup(rollup_cells, "Обладнання")
+            # Тисячі стовпців не читаються і повільно малюються: показуються перші N, решта - в групі "Інше"
+            chart_top_n = CHART_TOP_N
+            if len(equipment_rollup) > CHART_TOP_N:
+                chart_top_n = st.slider(
+                    "Кількість обладнання на графіках", min_value=5, max_value=min(len(equipment_rollup), 200),
+                    value=CHART_TOP_N, step=5, help="Решта обладнання об'єднується у стовпець «Інше»."
+                )
             st.markdown("##### Середній час до закриття по обладнанню")
-            if not unique_tasks_df["Час до закриття (хв)"].dropna().empty:
-                agg_avg_closure = unique_tasks_df.groupby("Обладнання")["Час до закриття (хв)"].mean().sort_values(ascending=False)
+            if rollup_totals.get(count_col("Час до закриття (хв)"), 0) > 0:
+                agg_avg_closure = measure_mean(
+                    top_n_with_other(equipment_rollup, lambda g: measure_mean(g, "Час до закриття (хв)"), chart_top_n),
+                    "Час до закриття (хв)"
+                )
                 fig_avg_closure = px.bar(agg_avg_closure, x=agg_avg_closure.index, y=agg_avg_closure.values, labels={'x':'Обладнання', 'y':'Середній час до закриття (хв)'}, title='Середній час до закриття по обладнанню', height=400)
                 st.plotly_chart(fig_avg_closure, use_container_width=True)
             else:
                 st.info("Немає даних для побудови графіка середнього часу до закриття по обладнанню.")
             
             st.markdown("##### Загальний час до виконання по обладнанню")
-            if not unique_tasks_df["Час до виконання (хв)"].dropna().empty:
+            if rollup_totals.get(count_col("Час до виконання (хв)"), 0) > 0:
                 # Оновлена логіка: агрегуємо суму і кількість заявок
-                agg_total_execution = unique_tasks_df.groupby("Обладнання").agg(
-                    {'Час до виконання (хв)': 'sum', 'Ідентифікатор': 'count'}
-                ).sort_values(by='Час до виконання (хв)', ascending=False).reset_index()
-                agg_total_execution.rename(columns={'Ідентифікатор': 'Кількість заявок'}, inplace=True)
+                agg_total_execution = top_n_with_other(
+                    equipment_rollup, lambda g: g[sum_col("Час до виконання (хв)")], chart_top_n
+                ).rename(columns={sum_col("Час до виконання (хв)"): 'Час до виконання (хв)'})
+                agg_total_execution = agg_total_execution.rename_axis("Обладнання").reset_index()
 
                 fig_total_execution = px.bar(
                     agg_total_execution, 
@@ -430,6 +643,54 @@ if df is not None and not df.empty:
                 st.info("Немає даних для побудови графіка загального часу до виконання по обладнанню.")
         else:
             st.info("Немає достатньо даних (або стовпця 'Обладнання') для аналізу часу на машину.")
+        if services_index is not None and not unique_tasks_df.empty:
+            st.markdown("##### Заявки та час до виконання по службах")
+            services_totals = service_totals(
+                services_index, df.index.get_indexer(unique_tasks_df.index), unique_tasks_df["Час до виконання (хв)"]
+            )
+            services_totals = services_totals[services_totals["Кількість заявок"] > 0].sort_values(by="Сума", ascending=False).reset_index()
+            if not services_totals.empty:
+                fig_services = px.bar(
+                    services_totals,
+                    x="Відповідальні служби",
+                    y="Сума",
+                    labels={'Відповідальні служби': 'Служба', 'Сума': 'Загальний час до виконання (хв)'},
+                    title='Загальний час до виконання по службах',
+                    height=400,
+                    hover_data=['Кількість заявок']
+                )
+                st.plotly_chart(fig_services, use_container_width=True)
+        st.markdown("---")
+
+        # --- Простої, MTTR та MTBF по обладнанню та лініях ---
+        st.subheader("⏱️ Простої, MTTR та MTBF")
+        st.markdown(
+            "Інтервали заявок типу «Простій» та «Простій РЦ» (від створення до виконання), що перекриваються, "
+            "об'єднуються окремо для кожного обладнання чи лінії. **MTTR** - середня тривалість простою, "
+            "**MTBF** - середній час роботи між простоями, **доступність** - частка часу без простою за обраний період."
+        )
+        downtime_level = st.radio("Рівень аналізу простоїв", ["Обладнання", "Лінія"], horizontal=True)
+        if downtime_level in unique_tasks_df.columns:
+            if downtime_level == "Обладнання" and equipment_downtime is not None:
+                level_downtime = equipment_downtime
+            else:
+                level_downtime = downtime_stats(unique_tasks_df, downtime_level, downtime_period_start, downtime_period_end)
+            if level_downtime.empty:
+                st.info("За обраний період простоїв не знайдено.")
+            else:
+                st.dataframe(
+                    level_downtime.reset_index(),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        DOWNTIME_COL: st.column_config.NumberColumn(DOWNTIME_COL, format="%.1f"),
+                        MTTR_COL: st.column_config.NumberColumn(MTTR_COL, format="%.1f"),
+                        MTBF_COL: st.column_config.NumberColumn(MTBF_COL, format="%.1f"),
+                        AVAILABILITY_COL: st.column_config.NumberColumn(AVAILABILITY_COL, format="%.2f"),
+                    },
+                )
+        else:
+            st.info(f"Відсутній стовпець '{downtime_level}' для аналізу простоїв.")
         st.success("✅ Аналіз успішно завершено!")
     except Exception as e:
         st.error(f"❌ Виникла помилка під час обробки файлу: {e}")
@@ -437,3 +698,4 @@ if df is not None and not df.empty:
         st.info("Будь ласка, перевірте ваш файл. Можливо, деякі стовпці відсутні або дані мають неочікуваний формат.")
 elif df is None:
     st.info("⬆️ Будь ласка, завантажте CSV-файл, щоб розпочати аналіз.")
+show_diagnostics()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from export_writer import write_workbook
+from pipeline import build_report, combine_results, process_file
+
+# --- Пакетна обробка CSV-файлів без інтерфейсу ---
+# Кожен файл обробляється в окремому процесі тим самим конвеєром, що й у
+# застосунку; для кожного файлу пишеться власний звіт, а для всіх разом -
+# зведений звіт по заявках з усіх файлів.
+COMBINED_REPORT_NAME = "зведений_звіт.xlsx"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетний аналіз CSV-файлів із заявками по обладнанню.")
+    parser.add_argument("input_dir", type=Path, help="Тека з CSV-файлами")
+    parser.add_argument("-o", "--output-dir", type=Path, default=None, help="Тека для звітів (за замовчуванням - вхідна тека)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Кількість процесів (за замовчуванням - кількість ядер)")
+    parser.add_argument("--pattern", default="*.csv", help="Шаблон імен файлів (за замовчуванням *.csv)")
+    parser.add_argument("--no-combined", action="store_true", help="Не формувати зведений звіт")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = sorted(args.input_dir.glob(args.pattern))
+    if not paths:
+        print(f"У теці {args.input_dir} немає файлів за шаблоном {args.pattern}.", file=sys.stderr)
+        return 1
+    output_dir = args.output_dir or args.input_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    workers = max(1, min(args.workers or 1, len(paths)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map зберігає порядок файлів, тож у зведеному звіті діє версія заявки з пізнішого за іменем файлу
+        results = list(executor.map(partial(process_file, output_dir=output_dir), paths))
+
+    failed = 0
+    for result in results:
+        if result.error:
+            failed += 1
+            print(f"❌ {result.name}: {result.error}", file=sys.stderr)
+        else:
+            print(f"✅ {result.name}: {len(result.tasks)} рядків")
+        for _, message in result.messages:
+            print(f"   {message}")
+
+    if not args.no_combined:
+        combined = combine_results(results)
+        if combined is not None:
+            (output_dir / COMBINED_REPORT_NAME).write_bytes(write_workbook(build_report(combined)))
+            print(f"📄 Зведений звіт: {output_dir / COMBINED_REPORT_NAME} ({len(combined)} заявок)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
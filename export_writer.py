@@ -0,0 +1,114 @@
+import time
+from collections import namedtuple
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# --- Потоковий експорт таблиці заявок ---
+# Файл формується лише на запит і частинами по CHUNK_ROWS рядків: Excel -
+# через write-only книгу openpyxl (рядки не тримаються в пам'яті як комірки),
+# CSV - дописуванням частин, Parquet - групами рядків через ParquetWriter.
+CHUNK_ROWS = 10_000
+ESTIMATE_SAMPLE_ROWS = 500
+
+ExportFormat = namedtuple("ExportFormat", ["label", "extension", "mime"])
+
+EXPORT_FORMATS = {
+    "xlsx": ExportFormat("Excel (.xlsx)", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ExportFormat("CSV (.csv)", "csv", "text/csv"),
+    "parquet": ExportFormat("Parquet (.parquet)", "parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def _write_xlsx_sheets(sheets, output):
+    workbook = Workbook(write_only=True)
+    for title, df in sheets.items():
+        # Назва аркуша Excel - не довше 31 символу
+        sheet = workbook.create_sheet(title=title[:31] if title else None)
+        sheet.append([str(col) for col in df.columns])
+        for chunk in _chunks(df):
+            # Пропуски - порожні комірки, як у DataFrame.to_excel
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                sheet.append(row)
+    workbook.save(output)
+
+
+def _write_xlsx(df, output):
+    _write_xlsx_sheets({None: df}, output)
+
+
+def _write_csv(df, output):
+    # UTF-8 з BOM і крапка з комою - файл коректно відкривається в Excel
+    output.write("\ufeff".encode("utf-8"))
+    for number, chunk in enumerate(_chunks(df)):
+        output.write(chunk.to_csv(sep=";", index=False, header=number == 0).encode("utf-8"))
+    if df.empty:
+        output.write(df.to_csv(sep=";", index=False).encode("utf-8"))
+
+
+def _write_parquet(df, output):
+    # Змішані об'єктні стовпці (наприклад, числа і рядки) зберігаються як рядки
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ("string", "empty"):
+            df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(output, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if df.empty:
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def write_export(df, export_format):
+    """Вміст файлу експорту у форматі `export_format` ("xlsx", "csv" або "parquet")."""
+    output = BytesIO()
+    _WRITERS[export_format](df, output)
+    return output.getvalue()
+
+
+def write_workbook(sheets):
+    """Книга Excel з кількома аркушами: `sheets` - назва аркуша -> датафрейм."""
+    output = BytesIO()
+    _write_xlsx_sheets(sheets, output)
+    return output.getvalue()
+
+
+def estimate_export(sample_df, total_rows, export_format):
+    """Орієнтовний розмір (байти) і час (секунди) експорту `total_rows` рядків за пробною вибіркою."""
+    sample_df = sample_df.head(ESTIMATE_SAMPLE_ROWS)
+    if sample_df.empty:
+        return 0, 0.0
+    started = time.perf_counter()
+    sample_size = len(write_export(sample_df, export_format))
+    elapsed = time.perf_counter() - started
+    # Частина розміру й часу не залежить від кількості рядків (заголовок, структура
+    # файлу) - її оцінює запис порожньої таблиці
+    started = time.perf_counter()
+    empty_size = len(write_export(sample_df.head(0), export_format))
+    empty_elapsed = time.perf_counter() - started
+    scale = total_rows / len(sample_df)
+    size = empty_size + max(sample_size - empty_size, 0) * scale
+    seconds = empty_elapsed + max(elapsed - empty_elapsed, 0.0) * scale
+    return int(np.ceil(size)), seconds
+
+
+def describe_estimate(size, seconds):
+    if size >= 1024 * 1024:
+        size_text = f"{size / (1024 * 1024):.1f} МБ"
+    else:
+        size_text = f"{max(size, 1) / 1024:.0f} КБ"
+    return f"Орієнтовно: {size_text}, формування ~{max(seconds, 0.1):.1f} с"
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- Фільтрація масками над кодами категорій ---
+# Стовпці фільтрів кодуються цілими числами один раз на набір даних. Кожен
+# фільтр дає булеву маску, яка кешується за його значенням, тож зміна одного
+# фільтра не перераховує інших; рядки вибираються лише один раз, за підсумковою маскою.
+CATEGORY_FILTER_COLUMNS = ["Тип заявки", "Цех", "Обладнання"]
+DATE_FILTER_COL = "Дата створення (для фільтра)"
+MAX_CACHED_MASKS = 32
+
+
+class FilterEngine:
+    """Коди категорій, каскадні варіанти фільтрів і кеш масок для одного набору даних."""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self._codes = {}
+        self._categories = {}
+        for col in CATEGORY_FILTER_COLUMNS:
+            if col in df.columns:
+                codes, categories = pd.factorize(df[col])
+                self._codes[col] = codes
+                self._categories[col] = categories
+        self._days = None
+        if DATE_FILTER_COL in df.columns:
+            self._days = pd.to_datetime(df[DATE_FILTER_COL]).to_numpy().astype("datetime64[D]")
+        # Пари (цех, обладнання), що зустрічаються в даних, для каскадного списку обладнання
+        self._workshop_equipment = None
+        if "Цех" in self._codes and "Обладнання" in self._codes:
+            pairs = np.unique(np.column_stack([self._codes["Цех"], self._codes["Обладнання"]]), axis=0)
+            self._workshop_equipment = pairs[(pairs >= 0).all(axis=1)]
+        self._masks = OrderedDict()
+        # Рушій спільний для всіх сесій, тому кеш масок захищено блокуванням
+        self._masks_lock = threading.Lock()
+
+    def options(self, col):
+        """Відсортовані значення стовпця без пропусків."""
+        return sorted(self._categories[col].tolist())
+
+    def equipment_options(self, workshops):
+        """Обладнання обраних цехів (усе обладнання, якщо цехи не обрано)."""
+        if not workshops or self._workshop_equipment is None:
+            return self.options("Обладнання")
+        workshop_codes = self._category_codes("Цех", workshops)
+        equipment_codes = self._workshop_equipment[np.isin(self._workshop_equipment[:, 0], workshop_codes), 1]
+        return sorted(self._categories["Обладнання"][np.unique(equipment_codes)].tolist())
+
+    def date_range(self):
+        return pd.Timestamp(self._days.min()).date(), pd.Timestamp(self._days.max()).date()
+
+    def _category_codes(self, col, values):
+        return self._categories[col].get_indexer(pd.Index(list(values)).intersection(self._categories[col]))
+
+    def cached_mask(self, name, key, compute):
+        """Маска фільтра `name` для значення `key`; `compute` викликається лише при новому значенні."""
+        cache_key = (name, key)
+        with self._masks_lock:
+            if cache_key in self._masks:
+                self._masks.move_to_end(cache_key)
+                return self._masks[cache_key]
+        mask = compute()
+        with self._masks_lock:
+            self._masks[cache_key] = mask
+            while len(self._masks) > MAX_CACHED_MASKS:
+                self._masks.popitem(last=False)
+        return mask
+
+    def category_mask(self, col, selected):
+        def compute():
+            # Таблиця належності за кодом; останній елемент - для пропусків (код -1)
+            selected_codes = np.zeros(len(self._categories[col]) + 1, dtype=bool)
+            selected_codes[self._category_codes(col, selected)] = True
+            return selected_codes[self._codes[col]]
+        return self.cached_mask(col, tuple(sorted(selected)), compute)
+
+    def date_mask(self, start_date, end_date):
+        def compute():
+            return (self._days >= np.datetime64(start_date, "D")) & (self._days <= np.datetime64(end_date, "D"))
+        return self.cached_mask(DATE_FILTER_COL, (start_date, end_date), compute)
+
+    def combine(self, masks):
+        """Одне AND усіх активних масок (None - фільтр не застосовується)."""
+        combined = np.ones(self.n_rows, dtype=bool)
+        for mask in masks:
+            if mask is not None:
+                combined &= mask
+        return combined
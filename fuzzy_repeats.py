@@ -0,0 +1,277 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from repeat_detection import (
+    ANOMALY_MAX_DELTA, ANOMALY_MIN_DELTA, CREATED_COL, DESCRIPTION_COL, ID_COL, LOCATION_COL,
+    build_repeat_index,
+)
+
+# --- Нечіткий пошук повторень за схожістю опису робіт ---
+# Описи розбиваються на символьні n-грами слів, для кожного унікального опису
+# рахується підпис MinHash, а пари-кандидати знаходяться через LSH (смуги підпису),
+# тож порівнювати всі пари описів не потрібно.
+FUZZY_FLAG_COL = "Схоже повторення"
+DEFAULT_SIMILARITY_THRESHOLD = 0.7
+NGRAM_SIZE = 3
+LSH_BANDS = 16
+LSH_ROWS = 4
+NUM_PERMUTATIONS = LSH_BANDS * LSH_ROWS
+# Обмеження на кількість сусідів у відсортованому кошику LSH, щоб дуже великі
+# кошики (однакові короткі описи) не давали квадратичну кількість пар
+MAX_BUCKET_NEIGHBOURS = 64
+# Запас для попереднього відбору за оцінкою схожості з підписів: похибка оцінки
+# з 64 перестановок близько 0.06, тож справді схожа пара відсіюється вкрай рідко
+ESTIMATE_MARGIN = 0.15
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_SHINGLE_BLOCK = 100_000
+_PAIR_BLOCK = 200_000
+_DENSE_LOCATION_LIMIT = 64_000_000
+
+DescriptionIndex = namedtuple("DescriptionIndex", ["raw_codes", "raw_uniques", "norm_codes", "signatures", "shingle_sets"])
+FuzzyIndex = namedtuple("FuzzyIndex", ["id_codes", "repeat_index", "description_index"])
+
+_APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "`": "'"})
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_description(text):
+    return " ".join(_WORD_RE.findall(str(text).translate(_APOSTROPHES).lower()))
+
+
+def _shingles(normalized_text):
+    # N-грами рахуються окремо для кожного слова, тому порядок слів не впливає на схожість
+    shingles = set()
+    for word in normalized_text.split():
+        padded = f" {word} "
+        if len(padded) <= NGRAM_SIZE:
+            shingles.add(padded)
+            continue
+        shingles.update(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+    return shingles
+
+
+def _minhash_signatures(shingle_sets, seed=0):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MERSENNE_PRIME), NUM_PERMUTATIONS, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_PRIME), NUM_PERMUTATIONS, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), NUM_PERMUTATIONS), _MERSENNE_PRIME, dtype=np.uint64)
+
+    lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    if lengths.sum() == 0:
+        return signatures
+    all_shingles = np.fromiter((sh for s in shingle_sets for sh in s), dtype=object, count=int(lengths.sum()))
+    values = pd.util.hash_array(all_shingles) % _MERSENNE_PRIME
+    doc_ends = np.cumsum(lengths)
+    doc_starts = doc_ends - lengths
+
+    # Обробка блоками документів, щоб матриця хешів не займала забагато пам'яті
+    doc = 0
+    n_docs = len(shingle_sets)
+    while doc < n_docs:
+        last = int(np.searchsorted(doc_ends, doc_starts[doc] + _SHINGLE_BLOCK, side="left"))
+        last = min(max(last, doc + 1), n_docs)
+        block_docs = np.arange(doc, last)
+        block_docs = block_docs[lengths[block_docs] > 0]
+        if len(block_docs):
+            block_start = doc_starts[block_docs[0]]
+            block = values[block_start:doc_ends[block_docs[-1]]]
+            hashed = (block[:, None] * a[None, :] + b[None, :]) % _MERSENNE_PRIME
+            signatures[block_docs] = np.minimum.reduceat(hashed, doc_starts[block_docs] - block_start, axis=0)
+        doc = last
+    return signatures
+
+
+def build_description_index(descriptions):
+    """Будує індекс MinHash по унікальних описах (один раз на набір даних)."""
+    raw_codes, raw_uniques = pd.factorize(np.asarray(descriptions, dtype=object))
+    normalized = [normalize_description(text) for text in raw_uniques]
+    norm_of_raw, norm_uniques = pd.factorize(np.asarray(normalized, dtype=object))
+    shingle_sets = [_shingles(text) for text in norm_uniques]
+    signatures = _minhash_signatures(shingle_sets)
+    return DescriptionIndex(raw_codes, raw_uniques, norm_of_raw, signatures, shingle_sets)
+
+
+class _LocationIndex:
+    """Пари (місце, опис) для перевірки, чи зустрічаються два описи на спільному місці."""
+
+    def __init__(self, location_codes, norm_codes, n_norm):
+        self.n_norm = np.int64(max(n_norm, 1))
+        n_locations = np.int64(location_codes.max() + 1 if len(location_codes) else 1)
+        keys = np.unique(location_codes * self.n_norm + norm_codes)
+        # Невелика матриця місце x опис дає пошук без бінарного пошуку
+        if n_locations * self.n_norm <= _DENSE_LOCATION_LIMIT:
+            self.present = np.zeros(n_locations * self.n_norm, dtype=bool)
+            self.present[keys] = True
+            self.keys = None
+        else:
+            self.present = None
+            self.keys = keys
+        by_description = np.unique(norm_codes * n_locations + location_codes)
+        self.locations = by_description % n_locations
+        self.degree = np.bincount(by_description // n_locations, minlength=n_norm)
+        self.offsets = np.concatenate([[0], np.cumsum(self.degree)[:-1]])
+
+    def _contains(self, queries):
+        if self.present is not None:
+            return self.present[queries]
+        positions = np.minimum(np.searchsorted(self.keys, queries), len(self.keys) - 1)
+        return self.keys[positions] == queries
+
+    def share_location(self, first, second):
+        # Розгортаються місця того опису пари, який зустрічається на меншій кількості місць
+        swap = self.degree[first] > self.degree[second]
+        expand, probe = np.where(swap, second, first), np.where(swap, first, second)
+        degree = self.degree[expand]
+        pair_rows = np.repeat(np.arange(len(expand)), degree)
+        within = np.arange(len(pair_rows)) - np.repeat(np.cumsum(degree) - degree, degree)
+        queries = self.locations[self.offsets[expand][pair_rows] + within] * self.n_norm + probe[pair_rows]
+        return np.bincount(pair_rows[self._contains(queries)], minlength=len(expand)) > 0
+
+
+def _candidate_filter(first, second, signatures, threshold, location_index):
+    keep = np.ones(len(first), dtype=bool)
+    if location_index is not None:
+        keep = location_index.share_location(first, second)
+    # Оцінка схожості за підписами відсіює більшість кандидатів до точної перевірки
+    estimated = (signatures[first[keep]] == signatures[second[keep]]).mean(axis=1)
+    keep[keep] = estimated >= threshold - ESTIMATE_MARGIN
+    return keep
+
+
+def similar_description_pairs(description_index, threshold=DEFAULT_SIMILARITY_THRESHOLD, location_codes=None):
+    """Пари нормалізованих описів (i < j) зі схожістю Жаккара не нижче порогу.
+
+    Якщо передано `location_codes` (місце кожного рядка, для якого будувався
+    індекс), повертаються лише пари описів, що зустрічаються на спільному місці.
+    """
+    signatures = description_index.signatures
+    shingle_sets = description_index.shingle_sets
+    candidates = np.flatnonzero([bool(shingles) for shingles in shingle_sets])
+    if len(candidates) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    n_docs = len(signatures)
+    location_index = None
+    if location_codes is not None:
+        norm_codes = description_index.norm_codes[description_index.raw_codes].astype(np.int64)
+        location_index = _LocationIndex(np.asarray(location_codes, dtype=np.int64), norm_codes, n_docs)
+
+    pair_codes = []
+    for band in range(LSH_BANDS):
+        band_values = np.ascontiguousarray(signatures[candidates, band * LSH_ROWS:(band + 1) * LSH_ROWS])
+        _, buckets = np.unique(band_values.view(np.dtype((np.void, band_values.dtype.itemsize * LSH_ROWS))), return_inverse=True)
+        buckets = buckets.ravel()
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        sorted_docs = candidates[order]
+        for offset in range(1, min(MAX_BUCKET_NEIGHBOURS, len(order) - 1) + 1):
+            same = sorted_buckets[offset:] == sorted_buckets[:-offset]
+            if not same.any():
+                break
+            first = sorted_docs[:-offset][same]
+            second = sorted_docs[offset:][same]
+            for start in range(0, len(first), _PAIR_BLOCK):
+                block_first, block_second = first[start:start + _PAIR_BLOCK], second[start:start + _PAIR_BLOCK]
+                keep = _candidate_filter(block_first, block_second, signatures, threshold, location_index)
+                block_first, block_second = block_first[keep], block_second[keep]
+                pair_codes.append(np.minimum(block_first, block_second) * n_docs + np.maximum(block_first, block_second))
+    if not pair_codes:
+        return np.empty((0, 2), dtype=np.int64)
+
+    pair_codes = np.unique(np.concatenate(pair_codes))
+    pairs = np.column_stack([pair_codes // n_docs, pair_codes % n_docs])
+    # Кандидати, що лишилися, перевіряються точною схожістю Жаккара множин n-грам
+    similarity = np.fromiter(
+        (
+            len(shingle_sets[i] & shingle_sets[j]) / len(shingle_sets[i] | shingle_sets[j])
+            for i, j in pairs
+        ),
+        dtype=float,
+        count=len(pairs),
+    )
+    return pairs[similarity >= threshold]
+
+
+def _window_counts(keys, times, query_keys, lower, upper):
+    """Кількість рядків з ключем query_key і часом у [lower, upper) для кожного запиту."""
+    # Ключі і час стискаються до щільних рангів, щоб складений ключ не переповнював int64
+    unique_keys = np.unique(keys)
+    unique_times = np.unique(times)
+    scale = np.int64(len(unique_times) + 1)
+    composite = np.sort(np.searchsorted(unique_keys, keys) * scale + np.searchsorted(unique_times, times))
+    query_positions = np.minimum(np.searchsorted(unique_keys, query_keys), len(unique_keys) - 1)
+    present = unique_keys[query_positions] == query_keys
+    lower_rank = np.searchsorted(unique_times, lower, side="left")
+    upper_rank = np.searchsorted(unique_times, upper, side="left")
+    counts = (
+        np.searchsorted(composite, query_positions * scale + upper_rank, side="left")
+        - np.searchsorted(composite, query_positions * scale + lower_rank, side="left")
+    )
+    return np.where(present, counts, 0)
+
+
+def fuzzy_repeat_flags(repeat_index, description_index, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                       min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    """Позначає заявки, перед якими на тому ж місці у вікні часу була заявка зі схожим, але іншим описом.
+
+    `description_index` має бути побудований по стовпцю опису того самого `repeat_index`.
+    """
+    n_rows = len(repeat_index)
+    flags = np.zeros(n_rows, dtype=bool)
+    if n_rows < 2:
+        return flags
+    location_codes, _ = pd.factorize(np.asarray(repeat_index[LOCATION_COL], dtype=object))
+    location_codes = location_codes.astype(np.int64)
+    times = np.asarray(repeat_index[CREATED_COL], dtype="datetime64[ns]").view(np.int64)
+    lower = times - max_delta.value
+    upper = times - min_delta.value
+    raw_codes = description_index.raw_codes.astype(np.int64)
+    norm_codes = description_index.norm_codes[raw_codes].astype(np.int64)
+    n_raw = max(len(description_index.raw_uniques), 1)
+    n_norm = max(len(description_index.signatures), 1)
+
+    # Той самий опис після нормалізації (регістр, розділові знаки), але інший вихідний текст
+    norm_keys = location_codes * n_norm + norm_codes
+    raw_keys = location_codes * n_raw + raw_codes
+    same_normalized = _window_counts(norm_keys, times, norm_keys, lower, upper)
+    same_raw = _window_counts(raw_keys, times, raw_keys, lower, upper)
+    flags |= same_normalized > same_raw
+
+    # Різні, але схожі описи: кожен рядок перевіряється для всіх схожих на його опис
+    pairs = similar_description_pairs(description_index, threshold, location_codes)
+    if len(pairs):
+        neighbours_from = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        neighbours_to = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        order = np.argsort(neighbours_from, kind="stable")
+        neighbours_from, neighbours_to = neighbours_from[order], neighbours_to[order]
+        degree = np.bincount(neighbours_from, minlength=n_norm)
+        offsets = np.concatenate([[0], np.cumsum(degree)])
+        row_degree = degree[norm_codes]
+        query_rows = np.repeat(np.arange(n_rows), row_degree)
+        if len(query_rows):
+            within = np.arange(len(query_rows)) - np.repeat(np.cumsum(row_degree) - row_degree, row_degree)
+            query_norm = neighbours_to[offsets[norm_codes[query_rows]] + within]
+            counts = _window_counts(
+                norm_keys, times, location_codes[query_rows] * n_norm + query_norm,
+                lower[query_rows], upper[query_rows],
+            )
+            flags |= np.bincount(query_rows[counts > 0], minlength=n_rows) > 0
+    return flags
+
+
+def build_fuzzy_index(df):
+    """Індекс для нечіткого пошуку: будується один раз на набір даних, поріг схожості задається окремо."""
+    id_codes, _ = pd.factorize(df[ID_COL], use_na_sentinel=False)
+    repeat_index = build_repeat_index(df)
+    return FuzzyIndex(id_codes, repeat_index, build_description_index(repeat_index[DESCRIPTION_COL]))
+
+
+def fuzzy_flags_for_rows(df, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                         min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA, fuzzy_index=None):
+    """Прапорці схожих повторень для всіх рядків датафрейму (усі рядки заявки отримують прапорець її першого рядка)."""
+    if fuzzy_index is None:
+        fuzzy_index = build_fuzzy_index(df)
+    flags = fuzzy_repeat_flags(fuzzy_index.repeat_index, fuzzy_index.description_index, threshold, min_delta, max_delta)
+    return pd.Series(flags[fuzzy_index.id_codes], index=df.index)
@@ -0,0 +1,408 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from csv_loader import CsvDetection, load_csv, sniff_csv
+from instrumentation import Instrumentation
+from preparation import DatasetError, DatasetLoadError, enrich_rows
+from repeat_detection import CREATED_COL, FLAG_COL, ID_COL, build_repeat_index, flag_repeat_index, update_repeat_index
+
+# --- Локальне колонкове сховище історії заявок ---
+# Кожне завантаження з новими або зміненими заявками додається окремою частиною
+# Parquet, індекс повторень (ключ, час і прапорець кожної заявки) - в окремому
+# невеликому файлі. Для кожного файлу зберігається перелік його заявок
+# (ідентифікатор і хеш вмісту), тож діє версія заявки з останнього файлу, де
+# вона є, навіть якщо цей файл повторив її без змін і окремих рядків не додав.
+# Маніфест - запис про фіксацію: частини та індекс, на які він не посилається,
+# вважаються незавершеним записом і видаляються.
+HISTORY_DIR = Path(os.environ.get("DOWNTIME_HISTORY_DIR", Path(__file__).resolve().parent / "history"))
+MANIFEST_FILE = "manifest.json"
+REPEAT_INDEX_FILE = "repeat_index.parquet"
+REPEAT_INDEX_PREFIX = "repeat_index-"
+PART_PREFIX = "part-"
+CONTENTS_PREFIX = "contents-"
+LOCK_FILE = "store.lock"
+LOCK_TIMEOUT = 60  # секунд очікування іншого завантаження
+LOCK_STALE_AFTER = 600  # секунд, після яких блокування вважається покинутим
+BUSY_MESSAGE = "⚠️ Сховище історії зайняте іншим завантаженням. Спробуйте ще раз."
+# Хеш вмісту заявки (усіх її рядків) - за ним визначаються змінені заявки
+CONTENT_HASH_COL = "_content_hash"
+# Хеш файлу, з якого походить пара (ідентифікатор, хеш вмісту), у переліках файлів
+UPLOAD_COL = "_upload"
+# Стовпці, з яких будується індекс повторень
+REPEAT_SOURCE_COLUMNS = [ID_COL, "Обладнання", "Лінія", "Опис робіт", CREATED_COL]
+
+
+class HistoryUnavailableError(DatasetError):
+    """Файл не можна додати до історії (немає стовпця ідентифікатора)."""
+
+
+def _read_manifest(store_dir):
+    manifest_path = Path(store_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {"version": 0, "files": {}, "parts": []}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(store_dir, manifest):
+    manifest_path = Path(store_dir) / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+@contextmanager
+def store_lock(store_dir, busy_message=BUSY_MESSAGE, timeout=LOCK_TIMEOUT):
+    """Блокування сховища між сесіями та процесами на час зміни (файл, створений з O_EXCL)."""
+    lock_path = Path(store_dir) / LOCK_FILE
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - lock_path.stat().st_mtime > LOCK_STALE_AFTER:
+                    # Блокування залишилося після аварійного завершення процесу
+                    lock_path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise DatasetError(busy_message, level="warning")
+            time.sleep(0.1)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        lock_path.unlink(missing_ok=True)
+
+
+def store_version(store_dir=HISTORY_DIR):
+    """Номер версії сховища; змінюється після кожної зміни історії."""
+    return _read_manifest(store_dir)["version"]
+
+
+def list_uploads(store_dir=HISTORY_DIR):
+    """Файли, додані до історії: хеш вмісту -> підсумок додавання."""
+    return _read_manifest(store_dir)["files"]
+
+
+def _read_contents(store_dir, manifest):
+    """Пари (ідентифікатор, хеш вмісту) усіх файлів історії у порядку додавання, з хешем файлу."""
+    frames = [
+        pd.read_parquet(Path(store_dir) / entry["contents"]).assign(**{UPLOAD_COL: upload_hash})
+        for upload_hash, entry in manifest["files"].items() if "contents" in entry
+    ]
+    if not frames:
+        return pd.DataFrame(columns=[ID_COL, CONTENT_HASH_COL, UPLOAD_COL])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _current_versions(contents):
+    """Хеш вмісту кожної заявки з останнього файлу, де вона є."""
+    return contents.drop_duplicates(subset=[ID_COL], keep="last").set_index(ID_COL)[CONTENT_HASH_COL]
+
+
+def _current_rows(frame, versions):
+    """Рядки частини без застарілих версій заявок, перелічених у файлах історії."""
+    claimed = frame[ID_COL].isin(versions.index).to_numpy()
+    if not claimed.any():
+        return frame
+    keep = ~claimed
+    if CONTENT_HASH_COL in frame.columns:
+        keep[claimed] = frame[CONTENT_HASH_COL].to_numpy()[claimed] == versions.loc[frame[ID_COL][claimed]].to_numpy()
+    return frame[keep]
+
+
+def _read_parts(store_dir, parts, columns=None, versions=None):
+    """Читає частини сховища; кожна заявка береться лише з останньої частини, де вона є.
+
+    `versions` - актуальні хеші вмісту заявок (з `_current_versions`): рядки
+    інших версій цих заявок не читаються. Частини старого формату без переліку
+    файлів і без хешу вмісту дають лише заявки, яких немає в `versions`.
+    """
+    requested = columns
+    if columns is not None:
+        columns = [ID_COL] + [col for col in columns if col != ID_COL]
+        if versions is not None and CONTENT_HASH_COL not in columns:
+            columns.append(CONTENT_HASH_COL)
+    frames = []
+    for part in parts:
+        part_path = Path(store_dir) / part
+        part_columns = columns
+        if columns is not None:
+            # Частини з різних файлів можуть мати різний набір стовпців
+            available = set(pq.read_schema(part_path).names)
+            part_columns = [col for col in columns if col in available]
+        frame = pd.read_parquet(part_path, columns=part_columns, memory_map=True)
+        if versions is not None:
+            frame = _current_rows(frame, versions)
+            if requested is not None and CONTENT_HASH_COL not in requested:
+                frame = frame.drop(columns=[CONTENT_HASH_COL], errors="ignore")
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    part_numbers = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    df = pd.concat(frames, ignore_index=True)
+    latest_part = pd.Series(part_numbers).groupby(df[ID_COL].to_numpy(), sort=False).transform("max").to_numpy()
+    if (latest_part == part_numbers).all():
+        return df
+    return df[latest_part == part_numbers].reset_index(drop=True)
+
+
+def _read_repeat_index(store_dir, manifest, columns=None):
+    repeat_index_path = Path(store_dir) / manifest.get("repeat_index", REPEAT_INDEX_FILE)
+    if not repeat_index_path.exists():
+        return None
+    return pd.read_parquet(repeat_index_path, columns=columns)
+
+
+def _write_repeat_index(store_dir, repeat_index, version):
+    name = f"{REPEAT_INDEX_PREFIX}{version:06d}.parquet"
+    tmp_path = Path(store_dir) / f"{name}.tmp"
+    repeat_index.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, Path(store_dir) / name)
+    return name
+
+
+def _remove_unreferenced(store_dir, manifest):
+    # Частини, переліки та індекси від перерваних або скасованих записів
+    referenced = set(manifest["parts"]) | {manifest.get("repeat_index", REPEAT_INDEX_FILE)}
+    referenced |= {entry["contents"] for entry in manifest["files"].values() if "contents" in entry}
+    for path in Path(store_dir).iterdir():
+        stored_file = path.name.startswith((PART_PREFIX, REPEAT_INDEX_PREFIX, CONTENTS_PREFIX)) or path.name == REPEAT_INDEX_FILE
+        if stored_file and path.name not in referenced:
+            path.unlink(missing_ok=True)
+
+
+def _commit(store_dir, manifest, repeat_index):
+    """Записує новий індекс повторень, а потім маніфест, який фіксує зміну."""
+    manifest["version"] += 1
+    manifest["repeat_index"] = _write_repeat_index(store_dir, repeat_index, manifest["version"])
+    _write_manifest(store_dir, manifest)
+    _remove_unreferenced(store_dir, manifest)
+
+
+def normalize_ids(ids):
+    """Ідентифікатори як рядки, однакові незалежно від того, як їх прочитав парсер."""
+    present = ids.notna()
+    if pd.api.types.is_numeric_dtype(ids) and not pd.api.types.is_bool_dtype(ids):
+        # Цілі ідентифікатори з пропусками читаються як float: 123.0 -> "123"
+        values = ids[present]
+        if (values % 1 == 0).all():
+            ids = ids.astype("Int64")
+        return ids.astype(str).where(present, None)
+    return ids.astype(str).str.strip().where(present, None)
+
+
+def _content_hashes(df):
+    """Хеш вмісту кожної заявки, однаковий для всіх її рядків і залежний від їх порядку."""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    positions = df.groupby(ID_COL, sort=False).cumcount().to_numpy().astype(np.uint64)
+    mixed = row_hashes ^ (positions * np.uint64(0x9E3779B97F4A7C15))
+    return pd.Series(mixed, index=df.index).groupby(df[ID_COL], sort=False).transform("sum")
+
+
+def _stored_hashes(store_dir, parts, versions):
+    stored = _read_parts(store_dir, parts, columns=[ID_COL, CONTENT_HASH_COL], versions=versions)
+    if CONTENT_HASH_COL not in stored.columns:
+        # Частини старого формату без хешу: такі заявки вважаються зміненими
+        stored[CONTENT_HASH_COL] = np.nan
+    return stored.drop_duplicates(subset=[ID_COL]).set_index(ID_COL)[CONTENT_HASH_COL]
+
+
+def _stored_pairs(store_dir, parts):
+    """Пари (ідентифікатор, хеш вмісту), рядки яких уже є в частинах сховища."""
+    frames = [
+        pd.read_parquet(Path(store_dir) / part, columns=[ID_COL, CONTENT_HASH_COL])
+        for part in parts if CONTENT_HASH_COL in pq.read_schema(Path(store_dir) / part).names
+    ]
+    if not frames:
+        return pd.MultiIndex.from_arrays([[], []], names=[ID_COL, CONTENT_HASH_COL])
+    return pd.MultiIndex.from_frame(pd.concat(frames, ignore_index=True)).unique()
+
+
+def _write_contents(store_dir, file_hash, ids, hashes):
+    name = f"{CONTENTS_PREFIX}{file_hash[:12]}.parquet"
+    tmp_path = Path(store_dir) / f"{name}.tmp"
+    contents = pd.DataFrame({ID_COL: ids.to_numpy(), CONTENT_HASH_COL: hashes.to_numpy()})
+    contents.drop_duplicates(subset=[ID_COL]).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, Path(store_dir) / name)
+    return name
+
+
+def _stored_summary(entry):
+    messages = [tuple(message) for message in entry.get("messages", [])]
+    detection = entry.get("detection")
+    return messages, CsvDetection(**detection) if detection else None
+
+
+def append_upload(file_bytes, file_hash, store_dir=HISTORY_DIR, file_name=None, probe=None):
+    """Додає до історії нові заявки з файлу та оновлює змінені.
+
+    Заявка вважається зміненою, якщо вміст її рядків відрізняється від
+    збереженого; тоді вона повністю замінюється новою версією. Повторне
+    завантаження того самого файлу розпізнається за хешем вмісту і не читає
+    файл знову. Повертає список повідомлень `(рівень, текст)` та результат
+    визначення формату CSV - для вже доданого файлу ті самі, що й першого разу.
+    Кроки додавання записуються окремими етапами в `probe` (Instrumentation), якщо його передано.
+    """
+    store_dir = Path(store_dir)
+    probe = probe or Instrumentation(enabled=False)
+    manifest = _read_manifest(store_dir)
+    if file_hash in manifest["files"]:
+        return _stored_summary(manifest["files"][file_hash])
+
+    if ID_COL not in sniff_csv(file_bytes)[3]:
+        raise HistoryUnavailableError(
+            f"⚠️ У файлі немає стовпця '{ID_COL}', тому його не можна додати до історії. Файл проаналізовано окремо.",
+            level="warning",
+        )
+    try:
+        with probe.stage("Читання CSV") as stage:
+            raw_df, detection = load_csv(file_bytes)
+            stage["rows_out"] = len(raw_df)
+    except Exception as e:
+        raise DatasetLoadError(str(e)) from e
+
+    messages = []
+    with probe.stage("Хеші вмісту заявок", rows_in=len(raw_df)) as stage:
+        raw_df[ID_COL] = normalize_ids(raw_df[ID_COL])
+        missing_id = raw_df[ID_COL].isna()
+        if missing_id.any():
+            messages.append(("warning", f"⚠️ Пропущено {int(missing_id.sum())} рядків без ідентифікатора."))
+            raw_df = raw_df[~missing_id]
+        hashes = _content_hashes(raw_df)
+        stage["rows_out"] = len(raw_df)
+
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with store_lock(store_dir):
+        manifest = _read_manifest(store_dir)
+        if file_hash in manifest["files"]:
+            return _stored_summary(manifest["files"][file_hash])
+
+        with probe.stage("Пошук нових і змінених заявок", rows_in=len(raw_df)) as stage:
+            versions = _current_versions(_read_contents(store_dir, manifest))
+            stored_hashes = _stored_hashes(store_dir, manifest["parts"], versions)
+            is_new = ~raw_df[ID_COL].isin(stored_hashes.index)
+            changed = (is_new | (raw_df[ID_COL].map(stored_hashes) != hashes)).to_numpy()
+            rows = raw_df[changed].copy()
+            rows[CONTENT_HASH_COL] = hashes[changed]
+            stage["rows_out"] = len(rows)
+        if not rows.empty:
+            with probe.stage("Розбір дат і тривалостей", rows_in=len(rows)) as stage:
+                rows, enrich_messages = enrich_rows(rows)
+                stage["rows_out"] = len(rows)
+            messages += enrich_messages
+        rows_added = int(is_new[rows.index].sum())
+        rows_updated = len(rows) - rows_added
+        rows_skipped = int((~changed).sum())
+
+        if not rows.empty:
+            rows = rows.reset_index(drop=True)
+            with probe.stage("Запис частини сховища", rows_in=len(rows)) as stage:
+                # Версія, до якої заявка повертається, вже може бути збережена з попереднього файлу
+                new_pairs = ~pd.MultiIndex.from_frame(rows[[ID_COL, CONTENT_HASH_COL]]).isin(
+                    _stored_pairs(store_dir, manifest["parts"])
+                )
+                if new_pairs.any():
+                    part_name = f"{PART_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{file_hash[:12]}.parquet"
+                    rows[new_pairs].to_parquet(store_dir / part_name, index=False)
+                    manifest["parts"].append(part_name)
+                stage["rows_out"] = int(new_pairs.sum())
+            # Переоцінюються лише ключі (місце + опис), яких торкаються нові та змінені заявки
+            with probe.stage("Позначення повторень", rows_in=len(rows)) as stage:
+                repeat_index = update_repeat_index(_read_repeat_index(store_dir, manifest), rows)
+                stage["rows_out"] = int(repeat_index[FLAG_COL].sum())
+
+        messages.append((
+            "info",
+            f"ℹ️ До історії додано {rows_added} нових рядків, оновлено {rows_updated}, "
+            f"{rows_skipped} вже були збережені раніше без змін.",
+        ))
+        manifest["files"][file_hash] = {
+            "name": file_name,
+            "uploaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "rows_added": rows_added,
+            "rows_updated": rows_updated,
+            "rows_skipped": rows_skipped,
+            "messages": messages,
+            "detection": detection._asdict(),
+            "contents": _write_contents(store_dir, file_hash, raw_df[ID_COL], hashes),
+        }
+        if rows.empty:
+            _write_manifest(store_dir, manifest)
+        else:
+            _commit(store_dir, manifest, repeat_index)
+    return messages, detection
+
+
+def _carry_rows(store_dir, manifest, removed_parts):
+    """Переносить з частин вилученого файлу рядки версій, які є в інших файлах історії.
+
+    Інший файл міг повторити заявку без змін і тому не мати власних рядків;
+    такі рядки записуються частиною останнього файлу, де є ця версія.
+    """
+    contents = _read_contents(store_dir, manifest)
+    if contents.empty or not removed_parts:
+        return
+    owners = contents.drop_duplicates(subset=[ID_COL, CONTENT_HASH_COL], keep="last")
+    owners = owners.set_index([ID_COL, CONTENT_HASH_COL])[UPLOAD_COL]
+    owners = owners[~owners.index.isin(_stored_pairs(store_dir, manifest["parts"]))]
+    if owners.empty:
+        return
+    for part in removed_parts:
+        part_path = Path(store_dir) / part
+        if CONTENT_HASH_COL not in pq.read_schema(part_path).names:
+            continue
+        rows = pd.read_parquet(part_path)
+        pairs = pd.MultiIndex.from_frame(rows[[ID_COL, CONTENT_HASH_COL]])
+        owner = pd.Series(owners.reindex(pairs).to_numpy(), index=rows.index)
+        for upload_hash, owned in rows[owner.notna()].groupby(owner[owner.notna()], sort=False):
+            part_name = (
+                f"{PART_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-carried{manifest['version'] + 1:06d}-{upload_hash[:12]}.parquet"
+            )
+            owned.reset_index(drop=True).to_parquet(Path(store_dir) / part_name, index=False)
+            manifest["parts"].append(part_name)
+        owners = owners[~owners.index.isin(pairs)]
+
+
+def remove_upload(file_hash, store_dir=HISTORY_DIR):
+    """Вилучає з історії заявки, додані з файлу; заявки інших файлів повертаються до своїх версій."""
+    store_dir = Path(store_dir)
+    with store_lock(store_dir):
+        manifest = _read_manifest(store_dir)
+        if manifest["files"].pop(file_hash, None) is None:
+            return
+        removed_parts = [part for part in manifest["parts"] if part.endswith(f"-{file_hash[:12]}.parquet")]
+        manifest["parts"] = [part for part in manifest["parts"] if part not in removed_parts]
+        _carry_rows(store_dir, manifest, removed_parts)
+        versions = _current_versions(_read_contents(store_dir, manifest))
+        remaining = _read_parts(store_dir, manifest["parts"], columns=REPEAT_SOURCE_COLUMNS, versions=versions)
+        repeat_index = flag_repeat_index(build_repeat_index(remaining)) if not remaining.empty else remaining
+        _commit(store_dir, manifest, repeat_index)
+
+
+def load_history(store_dir=HISTORY_DIR):
+    """Завантажує підготовлену історію з прапорцями повторень без повторної обробки."""
+    manifest = _read_manifest(store_dir)
+    if not manifest["parts"]:
+        return None
+    df = _read_parts(store_dir, manifest["parts"], versions=_current_versions(_read_contents(store_dir, manifest)))
+    df = df.drop(columns=[CONTENT_HASH_COL], errors="ignore")
+    repeat_index = _read_repeat_index(store_dir, manifest, columns=[ID_COL, FLAG_COL])
+    flags = repeat_index.set_index(ID_COL)[FLAG_COL]
+    df[FLAG_COL] = df[ID_COL].map(flags).fillna(False).astype(bool)
+    return df
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# --- Вимірювання етапів обробки (за бажанням користувача) ---
+# Для кожного етапу записуються час, пікова пам'ять і кількість рядків на
+# вході та виході; результати запуску дописуються рядком JSON у журнал, щоб
+# порівнювати затримки між сесіями. Пам'ять вимірює tracemalloc: він спільний
+# для всього процесу, тому при одночасній роботі кількох сесій пік приблизний.
+DIAGNOSTICS_LOG = Path(os.environ.get(
+    "DOWNTIME_DIAGNOSTICS_LOG", Path(__file__).resolve().parent / "diagnostics" / "runs.jsonl"
+))
+
+_tracing_lock = threading.Lock()
+_tracing_sessions = 0
+
+
+def _start_tracing():
+    global _tracing_sessions
+    with _tracing_lock:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_sessions += 1
+
+
+def _stop_tracing():
+    global _tracing_sessions
+    with _tracing_lock:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class Instrumentation:
+    """Записи етапів одного запуску; вимкнений екземпляр нічого не вимірює."""
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Вимірює блок коду; `rows_out` можна задати в записі всередині блоку.
+
+        Етапи не вкладаються один в одний: пік пам'яті скидається на початку кожного.
+        tracemalloc працює лише під час етапу, тож перерваний запуск скрипта
+        (st.rerun, st.stop) не лишає його увімкненим для всього сервера.
+        """
+        record = {"stage": name, "seconds": None, "peak_mb": None, "rows_in": rows_in, "rows_out": None}
+        if not self.enabled:
+            yield record
+            return
+        if self.trace_memory:
+            _start_tracing()
+        try:
+            if self.trace_memory:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            try:
+                yield record
+            finally:
+                record["seconds"] = time.perf_counter() - started
+                if self.trace_memory:
+                    record["peak_mb"] = max(tracemalloc.get_traced_memory()[1] - baseline, 0) / 2**20
+                self.stages.append(record)
+        finally:
+            if self.trace_memory:
+                _stop_tracing()
+
+    def add_substages(self, parent, records):
+        """Додає етапи, виміряні окремим екземпляром (наприклад, у кешованій функції), як складові `parent`.
+
+        Складові не входять у загальний час: його вже враховано в етапі `parent`.
+        """
+        if self.enabled:
+            self.stages.extend({**record, "parent": parent} for record in records)
+
+    def total_seconds(self):
+        return sum(record["seconds"] for record in self.stages if not record.get("parent"))
+
+    def table(self):
+        rows = [
+            {**record, "stage": f"↳ {record['stage']}"} if record.get("parent") else record
+            for record in self.stages
+        ]
+        return pd.DataFrame(rows, columns=["stage", "seconds", "peak_mb", "rows_in", "rows_out"]).rename(columns={
+            "stage": "Етап", "seconds": "Час (с)", "peak_mb": "Пік пам'яті (МБ)",
+            "rows_in": "Рядків на вході", "rows_out": "Рядків на виході",
+        })
+
+    def finish(self, context=None, log_path=DIAGNOSTICS_LOG):
+        """Завершує вимірювання і дописує запуск у журнал JSONL (один раз на запуск)."""
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            **(context or {}),
+            "total_seconds": self.total_seconds(),
+            "stages": self.stages,
+        }
+        log_path = Path(log_path)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from comments_store import COMMENT_COL, ID_COL
+
+# --- Режим економії пам'яті ---
+# Текстові стовпці з повторюваними значеннями (цех, лінія, обладнання, тип
+# заявки, дати й час рядками тощо) зберігаються як категорії, цілі числа - у
+# найменшому достатньому типі. Дробові тривалості лишаються float64: суми по
+# мільйонах рядків у float32 втрачали б точність показників.
+# Бюджет - скільки пам'яті може займати одна сесія: власна копія набору даних,
+# відфільтровані та розділені за службами рядки і сформований файл експорту.
+MEMORY_BUDGET_MB = float(os.environ.get("DOWNTIME_MEMORY_BUDGET_MB", 1024))
+# Стовпець стає категорією, якщо унікальних значень не більше цієї частки рядків
+CATEGORY_MAX_UNIQUE_SHARE = 0.5
+# Ідентифікатори майже унікальні, а коментарі редагуються і заповнюються
+# новими значеннями, тому ці стовпці лишаються текстом
+KEEP_TEXT_COLUMNS = [ID_COL, COMMENT_COL]
+
+
+def _is_text(series):
+    # Лише рядки: стовпець дат (об'єкти date) у категорії pd.to_datetime не перетворює на дати
+    if isinstance(series.dtype, pd.StringDtype):
+        return True
+    return pd.api.types.is_object_dtype(series) and pd.api.types.infer_dtype(series, skipna=True) == "string"
+
+
+def compact_frame(df):
+    """Датафрейм з категоріями замість повторюваного тексту та зменшеними цілими типами.
+
+    Значення не змінюються; повертає новий датафрейм, вхідний лишається як є.
+    """
+    columns = {}
+    max_unique = CATEGORY_MAX_UNIQUE_SHARE * len(df)
+    for col in df.columns:
+        series = df[col]
+        if _is_text(series):
+            if col not in KEEP_TEXT_COLUMNS and series.nunique(dropna=True) <= max_unique:
+                series = series.astype("category")
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in "iu":
+            series = pd.to_numeric(series, downcast="integer")
+        columns[col] = series
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs = dict(df.attrs)
+    return compact
+
+
+def frame_memory_mb(df):
+    """Пам'ять датафрейму разом із рядками Python, МБ."""
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def session_memory_mb(dataset_mb, dataset_rows, owned_rows, shared, extra_bytes=0):
+    """Оцінка пам'яті сесії, МБ.
+
+    `owned_rows` - кількість рядків у вибірках, які сесія тримає окремо від
+    набору даних (оцінюються за середнім розміром рядка набору); `shared` -
+    набір даних спільний для всіх сесій і не рахується у бюджет сесії.
+    """
+    row_mb = dataset_mb / max(dataset_rows, 1)
+    return (0.0 if shared else dataset_mb) + row_mb * sum(owned_rows) + extra_bytes / 2**20
+
+
+def describe_memory(used_mb, budget_mb=MEMORY_BUDGET_MB):
+    return f"Пам'ять сесії: ~{used_mb:,.0f} МБ з {budget_mb:,.0f} МБ".replace(",", " ")
@@ -0,0 +1,135 @@
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+from downtime_analytics import DOWNTIME_COL, downtime_stats
+from export_writer import write_workbook
+from history_store import normalize_ids
+from preparation import load_and_prepare
+from rollup_cube import COUNT_COL, DAY_COL, build_rollup_cube, cube_totals, measure_mean, rollup, sum_col
+
+# --- Спільний конвеєр обробки для застосунку та пакетного запуску ---
+# Завантаження й підготовка (preparation), показники, зведення по обладнанню
+# та формування звіту зібрані тут, щоб застосунок і командний рядок рахували
+# однаково.
+ID_COL = "Ідентифікатор"
+# Стовпці таблиці заявок (у застосунку перед ними додається "Статус")
+REPORT_COLUMNS = [
+    "Ідентифікатор", "Дата створення", "Час створення", "Тип заявки", "Цех",
+    "Лінія", "Обладнання", "Опис робіт", "Відповідальні служби",
+    "Час до виконання (хв)", "Час до закриття (хв)", "Звіт про виконану роботу",
+    "Реакція на заявки",
+]
+# Стовпці, потрібні для зведеного звіту по кількох файлах
+SUMMARY_COLUMNS = REPORT_COLUMNS + [
+    DAY_COL, "Час створення (datetime)", "Час виконання (datetime)", "Підозріле повторення",
+]
+EXCEL_MAX_ROWS = 1_048_575  # без рядка заголовка
+
+SummaryMetrics = namedtuple("SummaryMetrics", ["avg_execution", "avg_closure", "total_execution", "total_downtime"])
+FileResult = namedtuple("FileResult", ["name", "tasks", "messages", "error"])
+
+
+def unique_tasks(df):
+    """Один рядок на заявку (перший за ідентифікатором).
+
+    Якщо ідентифікатори не повторюються, повертається сам `df` без копіювання.
+    """
+    if df[ID_COL].is_unique:
+        return df
+    return df.drop_duplicates(subset=[ID_COL])
+
+
+def dataset_period(tasks_df):
+    """Період [перший день, день після останнього) для розрахунку простоїв."""
+    days = pd.to_datetime(tasks_df[DAY_COL])
+    return days.min(), days.max() + pd.Timedelta(days=1)
+
+
+def downtime_by_equipment(tasks_df, period_start, period_end):
+    """Простої по обладнанню (None, якщо стовпця обладнання немає)."""
+    if "Обладнання" not in tasks_df.columns:
+        return None
+    return downtime_stats(tasks_df, "Обладнання", period_start, period_end)
+
+
+def summary_metrics(cells, equipment_downtime):
+    """Середні та загальні показники зі зрізу куба і таблиці простоїв."""
+    totals = cube_totals(cells)
+    return SummaryMetrics(
+        avg_execution=measure_mean(totals, "Час до виконання (хв)"),
+        avg_closure=measure_mean(totals, "Час до закриття (хв)"),
+        total_execution=totals.get(sum_col("Час до виконання (хв)"), 0.0),
+        total_downtime=0.0 if equipment_downtime is None else equipment_downtime[DOWNTIME_COL].sum(),
+    )
+
+
+def equipment_summary(cells, equipment_downtime):
+    """Зведення по обладнанню: кількість заявок, час до виконання і закриття, простої."""
+    by_equipment = rollup(cells, "Обладнання")
+    summary = pd.DataFrame({
+        COUNT_COL: by_equipment[COUNT_COL],
+        "Загальний час до виконання (хв)": by_equipment[sum_col("Час до виконання (хв)")],
+        "Середній час до закриття (хв)": measure_mean(by_equipment, "Час до закриття (хв)"),
+    })
+    if equipment_downtime is not None:
+        summary = summary.join(equipment_downtime, how="left")
+    return summary.sort_values(COUNT_COL, ascending=False)
+
+
+def build_report(df, include_rows=True):
+    """Аркуші звіту для підготовленого датафрейму: показники, обладнання, лінії, календар, заявки."""
+    tasks = unique_tasks(df)
+    cells = build_rollup_cube(tasks)
+    period_start, period_end = dataset_period(tasks)
+    equipment_downtime = downtime_by_equipment(tasks, period_start, period_end)
+    metrics = summary_metrics(cells, equipment_downtime)
+    sheets = {
+        "Показники": pd.DataFrame({
+            "Показник": [
+                "Кількість заявок", "Середній час до виконання (хв)", "Середній час до закриття (хв)",
+                "Загальний час до виконання (хв)", "Загальний час простою (хв)",
+            ],
+            "Значення": [len(tasks), *metrics],
+        }),
+    }
+    if "Обладнання" in cells.columns:
+        sheets["Обладнання"] = equipment_summary(cells, equipment_downtime).reset_index()
+    if "Лінія" in tasks.columns:
+        sheets["Лінії"] = downtime_stats(tasks, "Лінія", period_start, period_end).reset_index()
+    sheets["Календар"] = rollup(cells, DAY_COL)[COUNT_COL].sort_index().reset_index()
+    if include_rows:
+        sheets["Заявки"] = df[[col for col in REPORT_COLUMNS if col in df.columns]].head(EXCEL_MAX_ROWS)
+    return sheets
+
+
+def process_file(path, output_dir=None):
+    """Підготовка одного CSV-файлу і (якщо задано `output_dir`) запис його звіту.
+
+    Виконується в окремому процесі, тому помилки повертаються в результаті, а
+    не піднімаються; для зведеного звіту повертаються лише потрібні стовпці.
+    """
+    path = Path(path)
+    try:
+        df, messages, _ = load_and_prepare(path.read_bytes(), path.name)
+        if df is None or df.empty:
+            return FileResult(path.name, None, messages, "Файл не містить даних для аналізу.")
+        if output_dir is not None:
+            report_path = Path(output_dir) / f"{path.stem}_звіт.xlsx"
+            report_path.write_bytes(write_workbook(build_report(df)))
+        tasks = df[[col for col in SUMMARY_COLUMNS if col in df.columns]]
+        return FileResult(path.name, tasks, messages, None)
+    except Exception as e:
+        return FileResult(path.name, None, [], f"{type(e).__name__}: {e}")
+
+
+def combine_results(results):
+    """Заявки з усіх файлів; якщо заявка є в кількох файлах, діє версія з останнього."""
+    frames = [result.tasks for result in results if result.tasks is not None]
+    if not frames:
+        return None
+    combined = pd.concat(frames, ignore_index=True)
+    # Ідентифікатори з різних файлів можуть бути прочитані як числа або як рядки
+    combined[ID_COL] = normalize_ids(combined[ID_COL])
+    return combined.drop_duplicates(subset=[ID_COL], keep="last").reset_index(drop=True)
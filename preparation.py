@@ -0,0 +1,130 @@
+import hashlib
+
+from csv_loader import load_csv
+from datetime_parsing import parse_datetime_columns
+from instrumentation import Instrumentation
+from repeat_detection import ANOMALY_MAX_DELTA, ANOMALY_MIN_DELTA, repeat_flags_for_rows
+
+CRITICAL_DATE_TIME_COLS = ["Дата створення", "Час створення"]
+# Позначка в `df.attrs`: ідентифікатори додано як номери рядків, тож вони не
+# визначають заявку поза цим файлом (за ними не можна зберігати коментарі)
+SYNTHETIC_IDS_ATTR = "synthetic_ids"
+
+
+class DatasetLoadError(Exception):
+    """Файл не вдалося прочитати як CSV."""
+
+
+class DatasetError(Exception):
+    """Дані прочитано, але їх неможливо підготувати до аналізу."""
+
+    def __init__(self, message, level="error"):
+        super().__init__(message)
+        self.level = level
+
+
+def file_content_hash(file_bytes):
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def has_synthetic_ids(df):
+    return bool(df.attrs.get(SYNTHETIC_IDS_ATTR, False))
+
+
+def enrich_rows(df):
+    """Додає стовпці за замовчуванням, розбирає дати та рахує тривалості.
+
+    Обробка не залежить від інших рядків, тому її можна виконувати лише для
+    нових рядків. Повертає датафрейм і список повідомлень `(рівень, текст)`.
+    """
+    messages = []
+
+    for col in CRITICAL_DATE_TIME_COLS:
+        if col not in df.columns:
+            raise DatasetError(f"❌ У файлі відсутній критично важливий стовпець: '{col}'. Будь ласка, перевірте ваш файл.")
+
+    if "Звіт про виконану роботу" not in df.columns:
+        df["Звіт про виконану роботу"] = ""
+        messages.append(("info", "ℹ️ Стовпець 'Звіт про виконану роботу' відсутній у файлі і був доданий як порожній."))
+    if "Реакція на заявки" not in df.columns:
+        df["Реакція на заявки"] = ""
+        messages.append(("info", "ℹ️ Додано новий стовпець 'Реакція на заявки' для коментарів."))
+    if "Ідентифікатор" not in df.columns:
+        df["Ідентифікатор"] = df.index + 1
+        df.attrs[SYNTHETIC_IDS_ATTR] = True
+        messages.append(("info", "ℹ️ Стовпець 'Ідентифікатор' відсутній у файлі і був доданий."))
+    if "Обладнання" not in df.columns:
+        df["Обладнання"] = "Не вказано"
+        messages.append(("info", "ℹ️ Стовпець 'Обладнання' відсутній у файлі і був доданий зі значенням 'Не вказано'."))
+    if "Опис робіт" not in df.columns:
+        df["Опис робіт"] = "Без опису"
+        messages.append(("info", "ℹ️ Стовпець 'Опис робіт' відсутній у файлі і був доданий зі значенням 'Без опису'."))
+    if "Відповідальні служби" not in df.columns:
+        df["Відповідальні служби"] = "Не вказано"
+        messages.append(("info", "ℹ️ Стовпець 'Відповідальні служби' відсутній у файлі і був доданий зі значенням 'Не вказано'."))
+
+    df['Час створення (datetime)'] = parse_datetime_columns(df, 'Дата створення', 'Час створення')
+    initial_rows = len(df)
+    df.dropna(subset=["Час створення (datetime)"], inplace=True)
+    if len(df) < initial_rows:
+        messages.append(("warning", f"⚠️ Видалено {initial_rows - len(df)} рядків через некоректний 'Час створення'."))
+
+    df['Час виконання (datetime)'] = parse_datetime_columns(df, 'Дата виконання', 'Час виконання')
+    df['Час закриття (datetime)'] = parse_datetime_columns(df, 'Дата закриття', 'Час закриття')
+    df["Дата створення (для фільтра)"] = df["Час створення (datetime)"].dt.date
+    df["Час до виконання (хв)"] = (df["Час виконання (datetime)"] - df["Час створення (datetime)"]).dt.total_seconds() / 60
+    df["Час до закриття (хв)"] = (df["Час закриття (datetime)"] - df["Час створення (datetime)"]).dt.total_seconds() / 60
+    return df, messages
+
+
+def flag_repeats(df, min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    """Позначає підозрілі повторення однієї проблеми на тому ж обладнанні."""
+    messages = []
+    if "Обладнання" in df.columns and "Опис робіт" in df.columns and "Час створення (datetime)" in df.columns:
+        df = df.reset_index(drop=True)
+        df['Підозріле повторення'] = repeat_flags_for_rows(df, min_delta, max_delta)
+    else:
+        messages.append(("warning", "⚠️ Неможливо виконати аналіз аномалій."))
+        df['Підозріле повторення'] = False
+
+    return df, messages
+
+
+def prepare_dataset(df, probe=None):
+    """Повна підготовка датафрейму: збагачення рядків і позначення повторень.
+
+    Якщо передано `probe` (Instrumentation), кожен крок записується в нього окремим етапом.
+    """
+    if df is None or df.empty:
+        return df, []
+    probe = probe or Instrumentation(enabled=False)
+    with probe.stage("Розбір дат і тривалостей", rows_in=len(df)) as stage:
+        df, messages = enrich_rows(df)
+        stage["rows_out"] = len(df)
+    if df.empty:
+        raise DatasetError("⚠️ Після обробки дат у файлі не залишилося дійсних даних.", level="warning")
+    with probe.stage("Позначення повторень", rows_in=len(df)) as stage:
+        df, repeat_messages = flag_repeats(df)
+        stage["rows_out"] = int(df["Підозріле повторення"].sum())
+    return df, messages + repeat_messages
+
+
+def load_and_prepare(file_bytes, file_name, probe=None):
+    """Повний етап підготовки для вмісту завантаженого файлу.
+
+    Повертає підготовлений датафрейм, повідомлення та результат визначення
+    формату CSV. Читання, розбір дат і позначення повторень записуються в
+    `probe`, якщо його передано.
+    """
+    # Перевірка типу файлу за розширенням
+    if not file_name.endswith('.csv'):
+        return None, [], None
+    probe = probe or Instrumentation(enabled=False)
+    try:
+        with probe.stage("Читання CSV") as stage:
+            df, detection = load_csv(file_bytes)
+            stage["rows_out"] = len(df)
+    except Exception as e:
+        raise DatasetLoadError(str(e)) from e
+    df, messages = prepare_dataset(df, probe=probe)
+    return df, messages, detection
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# --- Виявлення підозрілих повторень ---
+# Повторенням вважається заявка з тим самим місцем (обладнання або лінія) та
+# описом робіт, створена через (min_delta, max_delta] після попередньої.
+ANOMALY_MIN_DELTA = pd.Timedelta(days=0, minutes=1)
+ANOMALY_MAX_DELTA = pd.Timedelta(days=3)
+
+ID_COL = "Ідентифікатор"
+CREATED_COL = "Час створення (datetime)"
+FLAG_COL = "Підозріле повторення"
+LOCATION_COL = "problem_location"
+DESCRIPTION_COL = "problem_description"
+REPEAT_INDEX_COLUMNS = [ID_COL, LOCATION_COL, DESCRIPTION_COL, CREATED_COL, FLAG_COL]
+
+
+def _without_categories(series):
+    # У категорію не можна вписати нове значення, тому пропуски заповнюються у звичайному стовпці
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    return series
+
+
+def _as_text(series):
+    if pd.api.types.is_object_dtype(series) or isinstance(series.dtype, pd.StringDtype):
+        return series
+    return series.astype(str)
+
+
+def problem_location(df):
+    line = _without_categories(df["Лінія"]) if "Лінія" in df.columns else pd.Series(np.nan, index=df.index)
+    return _as_text(_without_categories(df["Обладнання"]).fillna(line.fillna('Невідоме обладнання')))
+
+
+def problem_description(df):
+    return _as_text(_without_categories(df["Опис робіт"]).fillna('Без опису робіт'))
+
+
+def detect_repeats(locations, descriptions, created, min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    """Повертає масив прапорців повторення для кожного рядка.
+
+    Місце та опис кодуються цілими числами, час - як int64 наносекунд, тому
+    сортування і порівняння виконуються без рядкових операцій.
+    """
+    location_codes, _ = pd.factorize(np.asarray(locations, dtype=object))
+    description_codes, description_uniques = pd.factorize(np.asarray(descriptions, dtype=object))
+    keys = location_codes.astype(np.int64) * max(len(description_uniques), 1) + description_codes
+    times = np.asarray(created, dtype="datetime64[ns]").view(np.int64)
+
+    n_rows = len(keys)
+    flags = np.zeros(n_rows, dtype=bool)
+    if n_rows < 2:
+        return flags
+    # np.lexsort стабільне: рядки з однаковим часом зберігають вихідний порядок
+    order = np.lexsort((times, keys))
+    sorted_keys = keys[order]
+    sorted_times = times[order]
+    deltas = sorted_times[1:] - sorted_times[:-1]
+    nat = np.iinfo(np.int64).min
+    valid = (sorted_keys[1:] == sorted_keys[:-1]) & (sorted_times[1:] != nat) & (sorted_times[:-1] != nat)
+    flags[order[1:]] = (
+        valid
+        & (deltas > min_delta.value)
+        & (deltas <= max_delta.value)
+    )
+    return flags
+
+
+def build_repeat_index(df):
+    """Компактний індекс для виявлення повторень: перший рядок кожної заявки."""
+    first_rows = df.drop_duplicates(subset=[ID_COL])
+    return pd.DataFrame({
+        ID_COL: first_rows[ID_COL].to_numpy(),
+        LOCATION_COL: problem_location(first_rows).to_numpy(),
+        DESCRIPTION_COL: problem_description(first_rows).to_numpy(),
+        CREATED_COL: first_rows[CREATED_COL].to_numpy(),
+    })
+
+
+def flag_repeat_index(repeat_index, min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    repeat_index[FLAG_COL] = detect_repeats(
+        repeat_index[LOCATION_COL], repeat_index[DESCRIPTION_COL], repeat_index[CREATED_COL],
+        min_delta, max_delta,
+    )
+    return repeat_index
+
+
+def repeat_flags_for_rows(df, min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    """Прапорці повторень для всіх рядків датафрейму (усі рядки заявки отримують прапорець її першого рядка)."""
+    id_codes, _ = pd.factorize(df[ID_COL], use_na_sentinel=False)
+    # Коди factorize йдуть у порядку першої появи, як і рядки після drop_duplicates
+    repeat_index = flag_repeat_index(build_repeat_index(df), min_delta, max_delta)
+    return pd.Series(repeat_index[FLAG_COL].to_numpy()[id_codes], index=df.index)
+
+
+def update_repeat_index(repeat_index, new_rows, min_delta=ANOMALY_MIN_DELTA, max_delta=ANOMALY_MAX_DELTA):
+    """Додає нові та оновлені заявки до індексу повторень і переоцінює лише зачеплені ними ключі.
+
+    Записи заявок, які вже є в індексі, замінюються новими. Прапорці кожного
+    ключа (місце + опис) залежать тільки від заявок цього ключа, тому
+    переоцінюються ключі нових записів і ключі замінених, а результат
+    збігається з повним перерахунком.
+    """
+    new_index = build_repeat_index(new_rows)
+    if repeat_index is None or repeat_index.empty:
+        return flag_repeat_index(new_index, min_delta, max_delta)
+    key_cols = [LOCATION_COL, DESCRIPTION_COL]
+    replaced = repeat_index[ID_COL].isin(new_index[ID_COL])
+    touched_keys = pd.MultiIndex.from_frame(
+        pd.concat([new_index[key_cols], repeat_index.loc[replaced, key_cols]], ignore_index=True)
+    )
+    kept = repeat_index[~replaced]
+    affected = pd.MultiIndex.from_frame(kept[key_cols]).isin(touched_keys)
+    # Старі рядки йдуть перед новими, тож порядок рівних за часом заявок зберігається
+    recomputed = flag_repeat_index(
+        pd.concat([kept[affected], new_index], ignore_index=True), min_delta, max_delta
+    )
+    return pd.concat([kept[~affected], recomputed], ignore_index=True)
@@ -0,0 +1,89 @@
+import pandas as pd
+
+# --- Попередньо агрегований куб заявок ---
+# Заявки групуються один раз на набір даних за днем, цехом, лінією, обладнанням,
+# типом заявки та прапорцем повторення. У кожній клітинці - кількість заявок і
+# суми та кількості заповнених значень тривалостей, тож середні та суми для
+# будь-якого зрізу рахуються по клітинках, а не по всіх рядках.
+DAY_COL = "Дата створення (для фільтра)"
+CUBE_DIMENSIONS = [DAY_COL, "Цех", "Лінія", "Обладнання", "Тип заявки", "Підозріле повторення"]
+MEASURE_COLUMNS = ["Час до виконання (хв)", "Час до закриття (хв)"]
+COUNT_COL = "Кількість заявок"
+OTHER_LABEL = "Інше"
+
+
+def sum_col(measure):
+    return f"{measure}: сума"
+
+
+def count_col(measure):
+    return f"{measure}: заповнено"
+
+
+def build_rollup_cube(tasks_df):
+    """Клітинки куба для датафрейму, в якому кожна заявка - один рядок."""
+    dimensions = [col for col in CUBE_DIMENSIONS if col in tasks_df.columns]
+    measures = [col for col in MEASURE_COLUMNS if col in tasks_df.columns]
+    aggregations = {COUNT_COL: (dimensions[0], "size")}
+    for measure in measures:
+        aggregations[sum_col(measure)] = (measure, "sum")
+        aggregations[count_col(measure)] = (measure, "count")
+    cells = tasks_df.groupby(dimensions, dropna=False, sort=False, observed=True).agg(**aggregations).reset_index()
+    if DAY_COL in cells.columns:
+        # День як datetime64 - зрізи за датами порівнюють масиви, а не об'єкти date
+        cells[DAY_COL] = pd.to_datetime(cells[DAY_COL])
+    return cells
+
+
+def slice_cube(cells, start_date=None, end_date=None, selections=None, anomalies_only=False):
+    """Клітинки, що відповідають фільтрам: діапазон дат, обрані значення стовпців, лише повторення."""
+    mask = pd.Series(True, index=cells.index)
+    if start_date is not None and DAY_COL in cells.columns:
+        mask &= cells[DAY_COL] >= pd.Timestamp(start_date)
+    if end_date is not None and DAY_COL in cells.columns:
+        mask &= cells[DAY_COL] <= pd.Timestamp(end_date)
+    for col, selected in (selections or {}).items():
+        if selected and col in cells.columns:
+            mask &= cells[col].isin(selected)
+    if anomalies_only and "Підозріле повторення" in cells.columns:
+        mask &= cells["Підозріле повторення"].astype(bool)
+    return cells[mask]
+
+
+def _additive_columns(cells):
+    return [col for col in cells.columns if col == COUNT_COL or col.endswith(": сума") or col.endswith(": заповнено")]
+
+
+def cube_totals(cells):
+    """Суми адитивних показників по всіх клітинках."""
+    return cells[_additive_columns(cells)].sum()
+
+
+def measure_mean(values, measure):
+    """Середнє значення тривалості з сум і кількостей (NaN, якщо значень немає)."""
+    filled = values[count_col(measure)]
+    if pd.api.types.is_scalar(filled):
+        return values[sum_col(measure)] / filled if filled > 0 else float("nan")
+    return values[sum_col(measure)] / filled.where(filled > 0)
+
+
+def rollup(cells, by):
+    """Адитивні показники, згруповані за стовпцем `by` (пропуски не групуються, як у groupby)."""
+    return cells.groupby(by, observed=True)[_additive_columns(cells)].sum()
+
+
+def top_n_with_other(grouped, rank_by, n, ascending=False):
+    """Перші `n` груп за `rank_by`; решта зводиться в одну групу "Інше (k)".
+
+    `rank_by` - функція від згрупованого датафрейму, що повертає значення для
+    сортування. Показники групи "Інше" сумуються, тому середні для неї
+    рахуються так само, як для звичайних груп.
+    """
+    order = rank_by(grouped).sort_values(ascending=ascending, na_position="last").index
+    grouped = grouped.loc[order]
+    if len(grouped) <= n:
+        return grouped
+    rest = grouped.iloc[n:]
+    other = rest.sum().to_frame(f"{OTHER_LABEL} ({len(rest)})").T
+    other.index.name = grouped.index.name
+    return pd.concat([grouped.iloc[:n], other])
@@ -0,0 +1,96 @@
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# --- Пошук по ідентифікатору та опису робіт ---
+# Для кожного стовпця унікальні значення нормалізуються і розбиваються на
+# триграми; інвертований індекс (триграма -> номери унікальних значень)
+# будується один раз на набір даних. Запит шукається як звичайний текст
+# (не регулярний вираз): кандидати - перетин списків його триграм, далі
+# перевірка входження підрядка лише для кандидатів.
+SEARCH_COLUMNS = ["Ідентифікатор", "Опис робіт"]
+GRAM_SIZE = 3
+
+ColumnIndex = namedtuple("ColumnIndex", ["row_codes", "texts", "normalized", "gram_slots", "offsets", "postings"])
+
+_APOSTROPHES = str.maketrans({"’": "'", "ʼ": "'", "`": "'", "‘": "'"})
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Нижній регістр, один вид апострофа та одинарні пробіли."""
+    return _SPACES_RE.sub(" ", text.lower().translate(_APOSTROPHES))
+
+
+def _build_column_index(values):
+    # Як і раніше, значення порівнюються у вигляді рядків (пропуск - "nan")
+    row_codes, texts = pd.factorize(values.astype(str))
+    texts = list(texts)
+    normalized = [normalize_text(text) for text in texts]
+    grams, owners = [], []
+    for owner, text in enumerate(normalized):
+        distinct = {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+        grams.extend(distinct)
+        owners.extend([owner] * len(distinct))
+    gram_codes, gram_uniques = pd.factorize(np.asarray(grams, dtype=object))
+    # Стабільне сортування зберігає зростання номерів значень у кожному списку
+    order = np.argsort(gram_codes, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(gram_codes, minlength=len(gram_uniques)))])
+    postings = np.asarray(owners, dtype=np.int64)[order]
+    gram_slots = {gram: slot for slot, gram in enumerate(gram_uniques)}
+    return ColumnIndex(row_codes, texts, normalized, gram_slots, offsets, postings)
+
+
+def build_search_index(df):
+    """Індекс для пошуку по стовпцях ідентифікатора та опису (ті, що є у датафреймі)."""
+    return {col: _build_column_index(df[col]) for col in SEARCH_COLUMNS if col in df.columns}
+
+
+def _candidates(column_index, normalized_query):
+    grams = {normalized_query[i:i + GRAM_SIZE] for i in range(len(normalized_query) - GRAM_SIZE + 1)}
+    if not grams:
+        # Запит коротший за триграму - перевіряються всі унікальні значення
+        return np.arange(len(column_index.texts))
+    postings = []
+    for gram in grams:
+        slot = column_index.gram_slots.get(gram)
+        if slot is None:
+            return np.empty(0, dtype=np.int64)
+        postings.append(column_index.postings[column_index.offsets[slot]:column_index.offsets[slot + 1]])
+    postings.sort(key=len)
+    candidates = postings[0]
+    for posting in postings[1:]:
+        candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        if not len(candidates):
+            break
+    return candidates
+
+
+def _matches(column_index, query, case_sensitive, normalize):
+    normalized_query = normalize_text(query)
+    candidates = _candidates(column_index, normalized_query)
+    if normalize:
+        found = [c for c in candidates if normalized_query in column_index.normalized[c]]
+    elif case_sensitive:
+        found = [c for c in candidates if query in column_index.texts[c]]
+    else:
+        lowered = query.lower()
+        found = [c for c in candidates if lowered in column_index.texts[c].lower()]
+    matched = np.zeros(len(column_index.texts) + 1, dtype=bool)
+    matched[np.asarray(found, dtype=np.int64)] = True
+    return matched[column_index.row_codes]
+
+
+def search_mask(search_index, query, case_sensitive=False, normalize=False):
+    """Маска рядків, у яких ідентифікатор або опис містить запит як підрядок.
+
+    За замовчуванням регістр не враховується; `normalize` додатково прирівнює
+    різні апострофи та кількість пробілів.
+    """
+    mask = None
+    for column_index in search_index.values():
+        column_mask = _matches(column_index, query, case_sensitive, normalize)
+        mask = column_mask if mask is None else mask | column_mask
+    return mask
@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# --- Індекс належності рядків до відповідальних служб ---
+# Стовпець "Відповідальні служби" містить кілька служб через кому. Він
+# розбирається один раз: кожен унікальний рядок розбивається окремо, а для
+# рядків датафрейму зберігається лише розріджена матриця належності у форматі
+# CSR (зміщення рядків + коди служб), без дублювання рядків як після explode.
+SERVICES_COL = "Відповідальні служби"
+
+ServicesIndex = namedtuple("ServicesIndex", ["services", "row_offsets", "service_codes", "entry_rows"])
+
+
+def split_services(value):
+    return [s.strip() for s in str(value).split(',') if s.strip()]
+
+
+def build_services_index(services):
+    """Будує індекс служб для стовпця (рядки без служб не належать жодній службі)."""
+    raw_codes, raw_uniques = pd.factorize(np.asarray(services, dtype=object))
+    parsed = [split_services(value) for value in raw_uniques]
+    all_services = sorted({service for parts in parsed for service in parts})
+    code_of = {service: code for code, service in enumerate(all_services)}
+
+    unique_lengths = np.array([len(parts) for parts in parsed] + [0], dtype=np.int64)
+    unique_offsets = np.concatenate([[0], np.cumsum(unique_lengths)[:-1]])
+    unique_codes = np.fromiter((code_of[s] for parts in parsed for s in parts), dtype=np.int32, count=int(unique_lengths.sum()))
+    # Пропущене значення (-1) вказує на фіктивний порожній рядок у кінці
+    row_lengths = unique_lengths[raw_codes]
+    row_offsets = np.concatenate([[0], np.cumsum(row_lengths)])
+    within = np.arange(row_offsets[-1]) - np.repeat(row_offsets[:-1], row_lengths)
+    service_codes = unique_codes[np.repeat(unique_offsets[raw_codes], row_lengths) + within]
+
+    entry_rows = np.repeat(np.arange(len(raw_codes)), row_lengths)
+    return ServicesIndex(all_services, row_offsets, service_codes, entry_rows)
+
+
+def _selected_codes(services_index, selected):
+    known = set(services_index.services)
+    return np.searchsorted(services_index.services, [s for s in selected if s in known])
+
+
+def services_mask(services_index, selected):
+    """Маска рядків, що належать хоча б одній з обраних служб."""
+    mask = np.zeros(len(services_index.row_offsets) - 1, dtype=bool)
+    selected_entries = np.isin(services_index.service_codes, _selected_codes(services_index, selected))
+    mask[services_index.entry_rows[selected_entries]] = True
+    return mask
+
+
+def explode_services(df, positions, services_index, selected=None):
+    """Рядок на кожну службу заявки, як `explode`, але без повторного розбору тексту.
+
+    `positions` - позиції рядків `df` в індексі. Рядок без служб лишається з
+    порожнім значенням; якщо обрано служби, лишаються тільки рядки цих служб.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    lengths = services_index.row_offsets[positions + 1] - services_index.row_offsets[positions]
+    repeats = np.maximum(lengths, 1)
+    out_rows = np.repeat(np.arange(len(positions)), repeats)
+    within = np.arange(len(out_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    has_service = within < lengths[out_rows]
+    codes = np.full(len(out_rows), -1, dtype=np.int64)
+    codes[has_service] = services_index.service_codes[
+        services_index.row_offsets[positions[out_rows[has_service]]] + within[has_service]
+    ]
+    if selected:
+        keep = np.isin(codes, _selected_codes(services_index, selected))
+        out_rows, codes = out_rows[keep], codes[keep]
+    # take дає окрему копію рядків, тож новий стовпець можна записати без ще однієї копії
+    exploded = df.take(out_rows)
+    names = np.asarray(services_index.services + [np.nan], dtype=object)
+    exploded[SERVICES_COL] = names[codes]
+    return exploded
+
+
+def service_totals(services_index, positions, values):
+    """Кількість заявок і сума значень по кожній службі для рядків з позиціями `positions`."""
+    positions = np.asarray(positions, dtype=np.int64)
+    lengths = services_index.row_offsets[positions + 1] - services_index.row_offsets[positions]
+    entries = np.repeat(np.arange(len(positions)), lengths)
+    within = np.arange(len(entries)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    codes = services_index.service_codes[services_index.row_offsets[positions[entries]] + within]
+    values = np.asarray(values, dtype=float)[entries]
+    n_services = len(services_index.services)
+    return pd.DataFrame({
+        "Кількість заявок": np.bincount(codes, minlength=n_services),
+        "Сума": np.bincount(codes, weights=np.nan_to_num(values), minlength=n_services),
+    }, index=pd.Index(services_index.services, name=SERVICES_COL))
@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.generate_requests import generate_requests, to_csv_bytes
+from benchmarks.run_benchmarks import compare, run_size
+from preparation import load_and_prepare
+
+
+@pytest.mark.parametrize("excel_serial", [False, True])
+def test_generated_export_is_fully_parsed(excel_serial):
+    generated = generate_requests(3000, seed=1, excel_serial=excel_serial)
+    df, messages, detection = load_and_prepare(to_csv_bytes(generated), "synthetic.csv")
+    assert detection.encoding == "cp1251" and detection.delimiter == ";"
+    assert len(df) == len(generated)
+    assert not any(level == "warning" for level, _ in messages)
+    # Виконання є приблизно в 90% заявок і завжди пізніше створення
+    executed = df["Час до виконання (хв)"].dropna()
+    assert 0.85 < len(executed) / len(df) < 0.95
+    assert (executed > 0).all()
+    assert df["Підозріле повторення"].mean() > 0.05
+
+
+def test_run_size_reports_every_stage():
+    results = run_size(2000, repeat=1, seed=0, measure_memory=False, skip={"excel_export"})
+    assert [r["stage"] for r in results] == [
+        "load", "datetime_parsing", "anomaly_detection", "filtering", "explode", "aggregation",
+    ]
+    assert all(r["seconds"] >= 0 and r["rows"] == 2000 for r in results)
+    report = {"results": results}
+    ratios = compare(report, report)
+    assert (ratios["time_ratio"].dropna() == 1).all()
+    assert len(ratios) == len(results)
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from comments_store import COMMENT_COL, ID_COL, comment_changes, load_comments, merge_comments, save_comments
+from low_memory import compact_frame
+from preparation import has_synthetic_ids, load_and_prepare
+
+
+def test_saved_comments_survive_filtering_and_override_file_comments(tmp_path):
+    save_comments({"1": "перевірено", "3": ""}, store_dir=tmp_path)
+    save_comments({"2": "замінено насос"}, store_dir=tmp_path)
+    assert load_comments(tmp_path) == {"1": "перевірено", "3": "", "2": "замінено насос"}
+
+    df = pd.DataFrame({ID_COL: [1, 1, 2, 3, 4], COMMENT_COL: ["", "", None, "з файлу", "з файлу"]})
+    # Після фільтра залишилися лише частина рядків - коментарі знаходяться за ідентифікатором
+    merged = merge_comments(df.iloc[[1, 3, 4]], load_comments(tmp_path))
+    assert merged[COMMENT_COL].tolist() == ["перевірено", "", "з файлу"]
+    assert merge_comments(df, {})[COMMENT_COL].tolist() == ["", "", "", "з файлу", "з файлу"]
+
+
+def test_comment_changes_are_keyed_by_normalized_identifier():
+    shown = pd.DataFrame({ID_COL: [10.0, 11.0, None], COMMENT_COL: ["", "старий", ""]})
+    edited = shown.assign(**{COMMENT_COL: ["новий", None, "без ідентифікатора"]})
+    assert comment_changes(shown, edited) == {"10": "новий", "11": ""}
+    assert comment_changes(shown, shown) == {}
+
+
+def test_row_numbers_added_as_identifiers_are_flagged():
+    csv = "Дата створення;Час створення;Опис робіт\n01.03.2024;08:00;Витік\n01.03.2024;09:00;Шум\n"
+    df, _, _ = load_and_prepare(csv.encode("utf-8"), "без_ідентифікаторів.csv")
+    assert df[ID_COL].tolist() == [1, 2]
+    assert has_synthetic_ids(df) and has_synthetic_ids(compact_frame(df)[df[ID_COL] > 1])
+
+    with_ids, _, _ = load_and_prepare(f"{ID_COL};{csv}".replace("\n0", "\n7;0").encode("utf-8"), "заявки.csv")
+    assert not has_synthetic_ids(with_ids)
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datetime_parsing import combine_and_convert_datetime, parse_datetime_columns
+
+
+def row_wise(df, date_col, time_col=None):
+    converted = df.apply(lambda row: combine_and_convert_datetime(row, date_col, time_col), axis=1)
+    return pd.to_datetime(converted, errors='coerce')
+
+
+def mixed_text_frame(n_rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    stamps = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365 * 24 * 60, n_rows), unit="min")
+    date_fmts = ["%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d"]
+    time_fmts = ["%H:%M:%S", "%H:%M"]
+    dates = [ts.strftime(date_fmts[i]) for ts, i in zip(stamps, rng.integers(0, len(date_fmts), n_rows))]
+    times = [ts.strftime(time_fmts[i]) for ts, i in zip(stamps, rng.integers(0, len(time_fmts), n_rows))]
+    df = pd.DataFrame({"Дата": dates, "Час": times}, dtype=object)
+    noise = rng.random(n_rows)
+    df.loc[noise < 0.05, "Дата"] = np.nan
+    df.loc[(noise >= 0.05) & (noise < 0.1), "Час"] = np.nan
+    df.loc[(noise >= 0.1) & (noise < 0.12), "Дата"] = "не дата"
+    df.loc[(noise >= 0.12) & (noise < 0.14), "Час"] = "  "
+    df.loc[(noise >= 0.14) & (noise < 0.15), "Дата"] = "2024-02-30"
+    return df
+
+
+def test_text_columns_match_row_wise():
+    df = mixed_text_frame()
+    expected = row_wise(df, "Дата", "Час")
+    result = parse_datetime_columns(df, "Дата", "Час")
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_dtype=False)
+
+
+def test_ambiguous_values_keep_priority_order():
+    df = pd.DataFrame({"Дата": ["01/02/2024", "13/02/2024", "02/03/2024"], "Час": ["10:00", "11:00", "12:00"]})
+    result = parse_datetime_columns(df, "Дата", "Час")
+    pd.testing.assert_series_equal(result, row_wise(df, "Дата", "Час"), check_names=False, check_dtype=False)
+    assert result.iloc[0] == pd.Timestamp("2024-01-02 10:00")
+
+
+def test_excel_serials_match_row_wise():
+    df = pd.DataFrame({
+        "Дата": [45000.0, 45001.5, np.nan, 45002.0],
+        "Час": [0.25, np.nan, 0.5, "текст"],
+    })
+    expected = row_wise(df, "Дата", "Час")
+    result = parse_datetime_columns(df, "Дата", "Час")
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_dtype=False)
+
+
+@pytest.mark.parametrize("time_col", [None, "Відсутній"])
+def test_date_only_and_missing_time_column(time_col):
+    df = mixed_text_frame(500, seed=1)[["Дата"]]
+    expected = row_wise(df, "Дата", time_col)
+    result = parse_datetime_columns(df, "Дата", time_col)
+    pd.testing.assert_series_equal(result, expected, check_names=False, check_dtype=False)
+
+
+def test_original_index_is_kept():
+    df = mixed_text_frame(200, seed=2)
+    df.index = df.index * 10 + 7
+    result = parse_datetime_columns(df, "Дата", "Час")
+    assert result.index.equals(df.index)
+    pd.testing.assert_series_equal(result, row_wise(df, "Дата", "Час"), check_names=False, check_dtype=False)
+
+
+def test_ambiguous_values_outside_a_sample_keep_priority_order():
+    # Тисячі однозначних дат день/місяць і кілька неоднозначних - вони мають розбиратися як місяць/день
+    days = [f"{day:02d}/01/2024" for day in range(13, 29)] * 300
+    df = pd.DataFrame({"Дата": days + ["01/02/2024"] * 3, "Час": "10:00"})
+    result = parse_datetime_columns(df, "Дата", "Час")
+    assert (result.iloc[-3:] == pd.Timestamp("2024-01-02 10:00")).all()
+    pd.testing.assert_series_equal(result, row_wise(df, "Дата", "Час"), check_names=False, check_dtype=False)
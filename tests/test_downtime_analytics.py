@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from downtime_analytics import (
+    AVAILABILITY_COL, DOWNTIME_COL, EPISODES_COL, MTBF_COL, MTTR_COL, downtime_stats, merge_intervals,
+)
+
+
+def make_requests(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 60 * 24 * 5, n_rows), unit="min")
+    duration = pd.to_timedelta(rng.integers(-30, 600, n_rows), unit="min")
+    executed = pd.Series(created + duration)
+    executed[rng.random(n_rows) < 0.1] = pd.NaT
+    return pd.DataFrame({
+        "Обладнання": rng.choice(["Прес 1", "Прес 2", "Верстат 3", None], n_rows),
+        "Тип заявки": rng.choice(["Простій", "Простій РЦ", "Ремонт"], n_rows),
+        "Час створення (datetime)": created,
+        "Час виконання (datetime)": executed.to_numpy(),
+    })
+
+
+def brute_force_minutes(df, period_start, period_end):
+    """Кількість хвилин простою кожного обладнання через множину зайнятих хвилин."""
+    minutes = {}
+    for _, row in df.iterrows():
+        if row["Тип заявки"] not in ("Простій", "Простій РЦ") or pd.isna(row["Обладнання"]) or pd.isna(row["Час виконання (datetime)"]):
+            continue
+        start = max(row["Час створення (datetime)"], period_start)
+        end = min(row["Час виконання (datetime)"], period_end)
+        busy = minutes.setdefault(row["Обладнання"], set())
+        busy.update(pd.date_range(start, end, freq="min", inclusive="left"))
+    return {name: len(busy) for name, busy in minutes.items() if busy}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_overlaps_are_counted_once(seed):
+    df = make_requests(300, seed)
+    period_start, period_end = pd.Timestamp("2024-03-02"), pd.Timestamp("2024-03-05")
+    stats = downtime_stats(df, "Обладнання", period_start, period_end)
+    assert stats[DOWNTIME_COL].to_dict() == pytest.approx(brute_force_minutes(df, period_start, period_end))
+
+    period_minutes = (period_end - period_start).total_seconds() / 60
+    assert (stats[MTTR_COL] * stats[EPISODES_COL]).to_numpy() == pytest.approx(stats[DOWNTIME_COL].to_numpy())
+    assert ((stats[MTTR_COL] + stats[MTBF_COL]) * stats[EPISODES_COL]).to_numpy() == pytest.approx(period_minutes)
+    assert stats[AVAILABILITY_COL].between(0, 100).all()
+
+
+def test_merge_intervals_joins_touching_and_nested():
+    groups, starts, ends = merge_intervals(
+        np.array([0, 0, 0, 0, 1, 1]), np.array([10, 0, 5, 30, 0, 3]), np.array([20, 10, 8, 40, 2, 4]),
+    )
+    assert groups.tolist() == [0, 0, 1, 1]
+    assert starts.tolist() == [0, 30, 0, 3]
+    assert ends.tolist() == [20, 40, 2, 4]
@@ -0,0 +1,44 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export_writer
+from export_writer import estimate_export, write_export
+
+
+def make_frame(n_rows):
+    return pd.DataFrame({
+        "Ідентифікатор": np.arange(n_rows),
+        "Дата створення": pd.Timestamp("2024-03-01") + pd.to_timedelta(np.arange(n_rows), unit="h"),
+        "Опис робіт": [f"Витік масла {i % 7}" for i in range(n_rows)],
+        "Час до виконання (хв)": np.where(np.arange(n_rows) % 5 == 0, np.nan, np.arange(n_rows) * 1.5),
+        "Реакція на заявки": ["" if i % 3 else "перевірено" for i in range(n_rows)],
+    })
+
+
+def read_back(content, export_format):
+    if export_format == "xlsx":
+        return pd.read_excel(BytesIO(content), keep_default_na=False, na_values=[""])
+    if export_format == "csv":
+        return pd.read_csv(BytesIO(content), sep=";", encoding="utf-8-sig", keep_default_na=False,
+                           na_values=[""], parse_dates=["Дата створення"])
+    return pd.read_parquet(BytesIO(content))
+
+
+@pytest.mark.parametrize("export_format", ["xlsx", "csv", "parquet"])
+def test_chunked_export_round_trips(monkeypatch, export_format):
+    monkeypatch.setattr(export_writer, "CHUNK_ROWS", 7)
+    df = make_frame(30)
+    restored = read_back(write_export(df, export_format), export_format)
+    expected = df.assign(**{"Реакція на заявки": df["Реакція на заявки"].replace("", np.nan)}) if export_format != "parquet" else df
+    pd.testing.assert_frame_equal(restored, expected, check_dtype=False)
+
+
+def test_estimate_scales_with_rows():
+    df = make_frame(2000)
+    size, seconds = estimate_export(df, len(df), "csv")
+    assert abs(size - len(write_export(df, "csv"))) / size < 0.1
+    assert seconds > 0
+    assert estimate_export(df.head(0), 100, "csv") == (0, 0.0)
@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import FilterEngine
+
+
+def make_frame(n_rows=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    workshops = np.array(["Цех 1", "Цех 2", "Цех 3", None], dtype=object)
+    equipment = np.array([f"Верстат {i}" for i in range(12)] + [None], dtype=object)
+    created = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, n_rows), unit="D")
+    return pd.DataFrame({
+        "Тип заявки": rng.choice(np.array(["Простій", "Простій РЦ", "Ремонт", None], dtype=object), n_rows),
+        "Цех": rng.choice(workshops, n_rows),
+        "Обладнання": rng.choice(equipment, n_rows),
+        "Дата створення (для фільтра)": pd.Series(created).dt.date,
+    })
+
+
+def test_masks_match_chained_filtering():
+    df = make_frame()
+    engine = FilterEngine(df)
+    start, end = datetime.date(2024, 1, 15), datetime.date(2024, 2, 20)
+    expected = df[df["Тип заявки"].isin(["Простій", "Ремонт"])]
+    expected = expected[expected["Цех"].isin(["Цех 2"])]
+    expected = expected[expected["Обладнання"].isin(["Верстат 3", "Верстат 7", "Немає такого"])]
+    expected = expected[(expected["Дата створення (для фільтра)"] >= start) & (expected["Дата створення (для фільтра)"] <= end)]
+
+    mask = engine.combine([
+        engine.category_mask("Тип заявки", ["Простій", "Ремонт"]),
+        engine.category_mask("Цех", ["Цех 2"]),
+        engine.category_mask("Обладнання", ["Верстат 3", "Верстат 7", "Немає такого"]),
+        engine.date_mask(start, end),
+    ])
+    pd.testing.assert_frame_equal(df[mask], expected)
+
+
+def test_options_and_cascading_equipment():
+    df = make_frame()
+    engine = FilterEngine(df)
+    assert engine.options("Цех") == sorted(df["Цех"].dropna().unique().tolist())
+    assert engine.equipment_options([]) == sorted(df["Обладнання"].dropna().unique().tolist())
+    selected = ["Цех 1", "Цех 3"]
+    assert engine.equipment_options(selected) == sorted(df[df["Цех"].isin(selected)]["Обладнання"].dropna().unique().tolist())
+    assert engine.date_range() == (df["Дата створення (для фільтра)"].min(), df["Дата створення (для фільтра)"].max())
+
+
+def test_masks_are_reused_per_filter_value():
+    engine = FilterEngine(make_frame(200))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return np.ones(200, dtype=bool)
+
+    first = engine.cached_mask("Цех", ("Цех 1",), compute)
+    engine.category_mask("Обладнання", ["Верстат 1"])
+    assert engine.cached_mask("Цех", ("Цех 1",), compute) is first
+    engine.cached_mask("Цех", ("Цех 2",), compute)
+    assert len(calls) == 2
+    assert engine.category_mask("Цех", ["Цех 2", "Цех 1"]) is engine.category_mask("Цех", ["Цех 1", "Цех 2"])
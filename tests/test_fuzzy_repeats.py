@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from fuzzy_repeats import (
+    _shingles, build_description_index, build_fuzzy_index, fuzzy_flags_for_rows, normalize_description,
+    similar_description_pairs,
+)
+from repeat_detection import ANOMALY_MAX_DELTA, ANOMALY_MIN_DELTA, ID_COL, repeat_flags_for_rows
+
+
+def make_requests(descriptions, minutes, equipment="Насос 1"):
+    return pd.DataFrame({
+        ID_COL: range(len(descriptions)),
+        "Обладнання": equipment,
+        "Лінія": "Лінія 1",
+        "Опис робіт": descriptions,
+        "Час створення (datetime)": pd.Timestamp("2024-05-01") + pd.to_timedelta(minutes, unit="min"),
+    })
+
+
+def jaccard(first, second):
+    first, second = _shingles(normalize_description(first)), _shingles(normalize_description(second))
+    return len(first & second) / len(first | second) if first | second else 0.0
+
+
+def brute_force(df, threshold):
+    """Повний перебір пар заявок: схожий, але не дослівно однаковий опис на тому ж місці у вікні часу."""
+    times = df["Час створення (datetime)"].tolist()
+    descriptions = df["Опис робіт"].tolist()
+    locations = df["Обладнання"].tolist()
+    flags = []
+    for i in range(len(df)):
+        flags.append(any(
+            locations[j] == locations[i]
+            and descriptions[j] != descriptions[i]
+            and ANOMALY_MIN_DELTA < times[i] - times[j] <= ANOMALY_MAX_DELTA
+            and jaccard(descriptions[i], descriptions[j]) >= threshold
+            for j in range(len(df))
+        ))
+    return np.array(flags)
+
+
+def test_reworded_descriptions_are_flagged_separately():
+    df = make_requests(["не працює насос", "Не працює насос!", "насос не працює", "Заміна фільтра"], [0, 60, 120, 180])
+    fuzzy = fuzzy_flags_for_rows(df)
+    exact = repeat_flags_for_rows(df)
+    assert fuzzy.tolist() == [False, True, True, False]
+    assert not exact.any()
+
+
+def test_other_location_and_window_are_ignored():
+    df = make_requests(["не працює насос", "Не працює насос!", "не працює насос."], [0, 60 * 24 * 4, 60 * 24 * 4 + 30])
+    df.loc[2, "Обладнання"] = "Насос 2"
+    assert not fuzzy_flags_for_rows(df).any()
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(0)
+    words = ["насос", "не", "працює", "заміна", "підшипника", "витік", "масла", "шум", "двигуна", "перегрів"]
+    descriptions = [" ".join(rng.choice(words, rng.integers(2, 5))) + rng.choice(["", "!", "."]) for _ in range(400)]
+    df = make_requests(descriptions, rng.integers(0, 60 * 24 * 30, 400))
+    df["Обладнання"] = rng.choice(["Насос 1", "Насос 2", "Прес"], 400)
+    for threshold in (0.6, 0.8):
+        expected = brute_force(df, threshold)
+        result = fuzzy_flags_for_rows(df, threshold).to_numpy()
+        # LSH може пропустити лише поодинокі пари, але ніколи не дає зайвих прапорців
+        assert not (result & ~expected).any()
+        assert (result & expected).sum() >= 0.95 * expected.sum()
+
+
+def test_prebuilt_index_gives_same_flags():
+    df = make_requests(["не працює насос", "Не працює насос!", "насос не працює"], [0, 60, 120])
+    fuzzy_index = build_fuzzy_index(df)
+    for threshold in (0.5, 0.7, 1.0):
+        pd.testing.assert_series_equal(
+            fuzzy_flags_for_rows(df, threshold, fuzzy_index=fuzzy_index), fuzzy_flags_for_rows(df, threshold)
+        )
+
+
+def test_similar_pairs_are_verified_exactly():
+    descriptions = pd.Series(["витік масла", "витік масла з двигуна", "шум підшипника", "шум підшипників"])
+    description_index = build_description_index(descriptions)
+    pairs = similar_description_pairs(description_index, threshold=0.5)
+    # Коди пар - номери унікальних нормалізованих описів у порядку першої появи
+    normalized = pd.unique(pd.Series([normalize_description(text) for text in description_index.raw_uniques]))
+    assert len(pairs)
+    for i, j in pairs:
+        assert jaccard(normalized[i], normalized[j]) >= 0.5
@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+
+from history_store import (
+    HistoryUnavailableError, append_upload, list_uploads, load_history, remove_upload, store_version,
+)
+from preparation import file_content_hash, load_and_prepare
+from repeat_detection import FLAG_COL, ID_COL
+
+
+def make_csv(ids, descriptions, minutes):
+    created = pd.Timestamp("2024-03-01 08:00") + pd.to_timedelta(minutes, unit="min")
+    df = pd.DataFrame({
+        ID_COL: ids,
+        "Дата створення": created.strftime("%d.%m.%Y"),
+        "Час створення": created.strftime("%H:%M"),
+        "Цех": "Цех 1",
+        "Обладнання": "Прес 1",
+        "Опис робіт": descriptions,
+    })
+    return df.to_csv(sep=";", index=False).encode("utf-8")
+
+
+def upload(file_bytes, store_dir):
+    return append_upload(file_bytes, file_content_hash(file_bytes), store_dir=store_dir, file_name="заявки.csv")
+
+
+def flags_by_id(df):
+    return df.drop_duplicates(subset=[ID_COL]).assign(**{ID_COL: lambda d: d[ID_COL].astype(str)}).set_index(ID_COL)[FLAG_COL].sort_index()
+
+
+def test_changed_requests_replace_stored_rows(tmp_path):
+    upload(make_csv([1, 2, 3], ["Витік", "Витік", "Шум"], [0, 60, 120]), tmp_path)
+    updated = make_csv([2, 3, 4], ["Шум", "Шум", "Витік"], [60, 120, 180])
+    messages, _ = upload(updated, tmp_path)
+    assert "додано 1 нових рядків, оновлено 1, 1 вже були збережені" in messages[-1][1]
+
+    history = load_history(tmp_path)
+    assert sorted(history[ID_COL]) == ["1", "2", "3", "4"]
+    assert history.set_index(ID_COL).loc["2", "Опис робіт"] == "Шум"
+    # Прапорці збігаються з повною обробкою актуальних версій заявок
+    expected, _, _ = load_and_prepare(make_csv([1, 2, 3, 4], ["Витік", "Шум", "Шум", "Витік"], [0, 60, 120, 180]), "a.csv")
+    pd.testing.assert_series_equal(flags_by_id(history), flags_by_id(expected))
+
+
+def test_repeated_upload_returns_stored_summary(tmp_path):
+    file_bytes = make_csv([1, 2], ["Витік", "Витік"], [0, 60])
+    first_messages, first_detection = upload(file_bytes, tmp_path)
+    version = store_version(tmp_path)
+    assert upload(file_bytes, tmp_path) == (first_messages, first_detection)
+    assert store_version(tmp_path) == version
+
+
+def test_float_ids_are_normalized(tmp_path):
+    upload(make_csv([1, 2], ["Витік", "Шум"], [0, 60]), tmp_path)
+    # Пропуск у стовпці робить ідентифікатори float: 1.0, 2.0
+    messages, _ = upload(make_csv([1, 2, None], ["Витік", "Шум", "Шум"], [0, 60, 90]), tmp_path)
+    assert "додано 0 нових рядків, оновлено 0, 2 вже були збережені" in messages[-1][1]
+    assert any("без ідентифікатора" in text for _, text in messages)
+    assert sorted(load_history(tmp_path)[ID_COL]) == ["1", "2"]
+
+
+def test_remove_upload_restores_previous_versions(tmp_path):
+    upload(make_csv([1, 2], ["Витік", "Витік"], [0, 60]), tmp_path)
+    second = make_csv([2, 3], ["Шум", "Шум"], [60, 120])
+    upload(second, tmp_path)
+    remove_upload(file_content_hash(second), store_dir=tmp_path)
+
+    history = load_history(tmp_path)
+    assert sorted(history[ID_COL]) == ["1", "2"]
+    assert history[FLAG_COL].tolist() == [False, True]
+    assert len(list_uploads(tmp_path)) == 1
+    assert len([p for p in tmp_path.iterdir() if p.name.startswith("part-")]) == 1
+
+
+def test_file_without_ids_is_rejected(tmp_path):
+    file_bytes = make_csv([1], ["Витік"], [0]).replace(ID_COL.encode("utf-8"), "Номер".encode("utf-8"))
+    with pytest.raises(HistoryUnavailableError):
+        upload(file_bytes, tmp_path)
+    assert load_history(tmp_path) is None
+
+
+def test_removing_a_file_keeps_requests_repeated_by_later_files(tmp_path):
+    # Щомісячні вивантаження перекриваються: лютневе містить і всі січневі заявки без змін
+    january = make_csv([1, 2, 3, 4, 5], ["Витік"] * 5, [0, 60, 120, 180, 240])
+    february = make_csv(list(range(1, 11)), ["Витік"] * 5 + ["Шум"] * 5, [0, 60, 120, 180, 240, 300, 360, 420, 480, 540])
+    upload(january, tmp_path)
+    messages, _ = upload(february, tmp_path)
+    assert "додано 5 нових рядків, оновлено 0, 5 вже були збережені" in messages[-1][1]
+
+    remove_upload(file_content_hash(january), store_dir=tmp_path)
+    history = load_history(tmp_path)
+    assert sorted(history[ID_COL], key=int) == [str(i) for i in range(1, 11)]
+    expected, _, _ = load_and_prepare(february, "b.csv")
+    pd.testing.assert_series_equal(flags_by_id(history), flags_by_id(expected))
+
+    # Після вилучення і лютневого файлу історія порожня
+    remove_upload(file_content_hash(february), store_dir=tmp_path)
+    assert load_history(tmp_path) is None
+
+
+def test_removing_the_latest_file_restores_the_version_of_an_earlier_one(tmp_path):
+    first = make_csv([1, 2], ["Витік", "Витік"], [0, 60])
+    changed = make_csv([1, 2], ["Шум", "Витік"], [0, 60])
+    reverted = make_csv([1, 2, 3], ["Витік", "Витік", "Шум"], [0, 60, 120])
+    for file_bytes in (first, changed, reverted):
+        upload(file_bytes, tmp_path)
+    assert load_history(tmp_path).set_index(ID_COL).loc["1", "Опис робіт"] == "Витік"
+
+    # Без першого файлу заявка 1 лишається у версії останнього, а він повторює першу версію
+    remove_upload(file_content_hash(first), store_dir=tmp_path)
+    assert load_history(tmp_path).set_index(ID_COL).loc["1", "Опис робіт"] == "Витік"
+    remove_upload(file_content_hash(reverted), store_dir=tmp_path)
+    history = load_history(tmp_path).set_index(ID_COL)
+    assert sorted(history.index) == ["1", "2"]
+    assert history.loc["1", "Опис робіт"] == "Шум"
@@ -0,0 +1,75 @@
+import json
+import tracemalloc
+
+import numpy as np
+
+from instrumentation import Instrumentation
+from preparation import load_and_prepare
+
+
+def test_stages_are_logged_as_one_json_line(tmp_path):
+    log_path = tmp_path / "runs.jsonl"
+    probe = Instrumentation()
+    with probe.stage("Фільтрація", rows_in=1000) as stage:
+        kept = np.ones(1000, dtype=bool)
+        stage["rows_out"] = int(kept.sum())
+    with probe.stage("Виділення пам'яті") as stage:
+        data = np.ones(2**20)  # 8 МБ
+        stage["rows_out"] = len(data)
+    probe.finish({"session": "s1"}, log_path=log_path)
+    probe.finish({"session": "s1"}, log_path=log_path)
+
+    table = probe.table()
+    assert list(table["Етап"]) == ["Фільтрація", "Виділення пам'яті"]
+    assert table.loc[0, "Рядків на вході"] == 1000 and table.loc[0, "Рядків на виході"] == 1000
+    assert table.loc[1, "Пік пам'яті (МБ)"] >= 7.5
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["session"] == "s1"
+    assert [record["stage"] for record in entry["stages"]] == ["Фільтрація", "Виділення пам'яті"]
+    assert entry["total_seconds"] >= 0
+
+
+def test_disabled_probe_records_nothing(tmp_path):
+    log_path = tmp_path / "runs.jsonl"
+    probe = Instrumentation(enabled=False)
+    with probe.stage("Фільтрація", rows_in=10) as stage:
+        stage["rows_out"] = 5
+    probe.finish(log_path=log_path)
+    assert probe.table().empty
+    assert not log_path.exists()
+
+
+def test_interrupted_stage_does_not_leave_tracing_on():
+    class Rerun(BaseException):
+        """Як RerunException у Streamlit - не Exception."""
+
+    assert not tracemalloc.is_tracing()
+    for _ in range(3):
+        probe = Instrumentation()
+        try:
+            with probe.stage("Фільтрація"):
+                raise Rerun()
+        except Rerun:
+            pass
+        assert len(probe.stages) == 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_preparation_steps_are_recorded_as_substages(tmp_path):
+    csv = "Ідентифікатор;Дата створення;Час створення;Обладнання;Опис робіт\n1;01.03.2024;08:00;Прес;Витік\n2;01.03.2024;09:00;Прес;Витік\n"
+    load_probe = Instrumentation(trace_memory=False)
+    df, _, _ = load_and_prepare(csv.encode("utf-8"), "заявки.csv", probe=load_probe)
+    assert [record["stage"] for record in load_probe.stages] == ["Читання CSV", "Розбір дат і тривалостей", "Позначення повторень"]
+    assert load_probe.stages[1]["rows_out"] == len(df) == 2
+
+    probe = Instrumentation()
+    with probe.stage("Завантаження та підготовка файлу"):
+        pass
+    probe.add_substages("Завантаження та підготовка файлу", load_probe.stages)
+    assert list(probe.table()["Етап"])[1:] == ["↳ Читання CSV", "↳ Розбір дат і тривалостей", "↳ Позначення повторень"]
+    assert probe.total_seconds() == probe.stages[0]["seconds"]
+    probe.finish(log_path=tmp_path / "runs.jsonl")
+    assert json.loads((tmp_path / "runs.jsonl").read_text(encoding="utf-8"))["total_seconds"] == probe.stages[0]["seconds"]
@@ -0,0 +1,52 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generate_requests import generate_requests, to_csv_bytes
+from fuzzy_repeats import fuzzy_flags_for_rows
+from low_memory import compact_frame, frame_memory_mb, session_memory_mb
+from pipeline import build_report, unique_tasks
+from preparation import load_and_prepare
+from services_index import build_services_index, explode_services
+
+
+@pytest.fixture(scope="module")
+def prepared():
+    df, _, _ = load_and_prepare(to_csv_bytes(generate_requests(3000, seed=2)), "synthetic.csv")
+    return df
+
+
+def test_compact_frame_keeps_values_and_shrinks_memory(prepared):
+    compact = compact_frame(prepared)
+    assert isinstance(compact["Обладнання"].dtype, pd.CategoricalDtype)
+    assert compact["Реакція на заявки"].dtype == object
+    assert compact["Ідентифікатор"].dtype.itemsize < prepared["Ідентифікатор"].dtype.itemsize
+    assert compact["Час до виконання (хв)"].dtype == np.float64
+    pd.testing.assert_frame_equal(
+        compact.astype(object).where(compact.notna(), None), prepared.astype(object).where(prepared.notna(), None)
+    )
+    assert frame_memory_mb(compact) < frame_memory_mb(prepared) / 2
+
+
+def test_compact_frame_gives_the_same_report_and_flags(prepared):
+    compact = compact_frame(prepared)
+    for name, sheet in build_report(prepared, include_rows=False).items():
+        compact_sheet = build_report(compact, include_rows=False)[name]
+        pd.testing.assert_frame_equal(compact_sheet.astype(object), sheet.astype(object), check_index_type=False)
+    np.testing.assert_array_equal(fuzzy_flags_for_rows(compact, 0.8), fuzzy_flags_for_rows(prepared, 0.8))
+
+
+def test_explode_and_unique_tasks_do_not_copy_twice(prepared):
+    compact = compact_frame(prepared)
+    assert unique_tasks(compact) is compact
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        exploded = explode_services(compact, np.arange(len(compact)), build_services_index(compact["Відповідальні служби"]))
+    assert len(exploded) > len(compact)
+
+
+def test_session_memory_counts_shared_dataset_only_once():
+    assert session_memory_mb(100, 1000, [500], shared=False) == pytest.approx(150)
+    assert session_memory_mb(100, 1000, [500, 250], shared=True, extra_bytes=2**20) == pytest.approx(76)
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from downtime_cli import COMBINED_REPORT_NAME, main
+from pipeline import build_report, process_file
+
+
+def write_csv(path, ids, minutes, request_type="Простій"):
+    created = pd.Timestamp("2024-03-01 08:00") + pd.to_timedelta(minutes, unit="min")
+    executed = created + pd.Timedelta(minutes=30)
+    pd.DataFrame({
+        "Ідентифікатор": ids,
+        "Дата створення": created.strftime("%d.%m.%Y"),
+        "Час створення": created.strftime("%H:%M"),
+        "Дата виконання": executed.strftime("%d.%m.%Y"),
+        "Час виконання": executed.strftime("%H:%M"),
+        "Тип заявки": request_type,
+        "Цех": "Цех 1",
+        "Лінія": "Лінія 1",
+        "Обладнання": "Прес 1",
+        "Опис робіт": "Витік",
+    }).to_csv(path, sep=";", index=False, encoding="cp1251")
+
+
+def test_report_metrics_count_overlapping_downtime_once(tmp_path):
+    write_csv(tmp_path / "цех1.csv", [1, 2, 3], [0, 10, 120])
+    result = process_file(tmp_path / "цех1.csv")
+    assert result.error is None
+    metrics = build_report(result.tasks)["Показники"].set_index("Показник")["Значення"]
+    assert metrics["Кількість заявок"] == 3
+    assert metrics["Загальний час до виконання (хв)"] == pytest.approx(90)
+    # Заявки 1 і 2 перекриваються: 0-30 і 10-40 хвилин дають 40 хвилин простою
+    assert metrics["Загальний час простою (хв)"] == pytest.approx(70)
+
+
+def test_cli_writes_per_file_and_combined_reports(tmp_path, capsys):
+    input_dir, output_dir = tmp_path / "вхід", tmp_path / "звіти"
+    input_dir.mkdir()
+    write_csv(input_dir / "a.csv", [1, 2, 3], [0, 60, 120])
+    write_csv(input_dir / "b.csv", [3, 4], [120, 180], request_type="Ремонт")
+    (input_dir / "broken.csv").write_bytes(b"")
+
+    assert main([str(input_dir), "-o", str(output_dir), "-w", "2"]) == 1
+    assert "broken.csv" in capsys.readouterr().err
+    assert (output_dir / "a_звіт.xlsx").exists() and (output_dir / "b_звіт.xlsx").exists()
+
+    combined = pd.read_excel(output_dir / COMBINED_REPORT_NAME, sheet_name=None)
+    assert sorted(combined["Заявки"]["Ідентифікатор"]) == [1, 2, 3, 4]
+    # Заявка 3 є в обох файлах - діє версія з b.csv
+    assert combined["Заявки"].set_index("Ідентифікатор").loc[3, "Тип заявки"] == "Ремонт"
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from repeat_detection import (
+    ANOMALY_MAX_DELTA, ANOMALY_MIN_DELTA, FLAG_COL, ID_COL, build_repeat_index, flag_repeat_index,
+    repeat_flags_for_rows, update_repeat_index,
+)
+
+
+def sort_diff_merge(df):
+    """Попередня реалізація: сортування за рядковим ключем, diff у групах і merge за ідентифікатором."""
+    first_rows = df.drop_duplicates(subset=[ID_COL]).copy()
+    first_rows['problem_location'] = first_rows['Обладнання'].fillna(first_rows['Лінія'].fillna('Невідоме обладнання')).astype(str)
+    first_rows['problem_description'] = first_rows['Опис робіт'].fillna('Без опису робіт').astype(str)
+    first_rows['problem_key'] = first_rows['problem_location'] + " ### " + first_rows['problem_description']
+    first_rows = first_rows.sort_values(by=['problem_key', 'Час створення (datetime)'])
+    first_rows['time_diff'] = first_rows.groupby('problem_key')['Час створення (datetime)'].diff()
+    first_rows[FLAG_COL] = (first_rows['time_diff'] > ANOMALY_MIN_DELTA) & (first_rows['time_diff'] <= ANOMALY_MAX_DELTA)
+    flags = first_rows[[ID_COL, FLAG_COL]].drop_duplicates(subset=ID_COL, keep='first')
+    merged = df.merge(flags, on=ID_COL, how='left')
+    return merged[FLAG_COL].fillna(False).astype(bool)
+
+
+def make_requests(n_requests, seed=0, rows_per_request=3):
+    rng = np.random.default_rng(seed)
+    ids = np.repeat(np.arange(n_requests), rng.integers(1, rows_per_request + 1, n_requests))
+    n_rows = len(ids)
+    equipment = pd.Series(rng.choice(["Прес 1", "Прес 2", "Насос", None], n_rows), dtype=object)
+    line = pd.Series(rng.choice(["Лінія 1", "Лінія 2", None], n_rows), dtype=object)
+    description = pd.Series(rng.choice(["Витік", "Шум", "Заміна фільтра", None], n_rows), dtype=object)
+    # Хвилини з невеликого діапазону, щоб були і однакові моменти, і інтервали на межах вікна
+    created = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60 * 24 * 20, n_requests)[ids], unit="min")
+    created = pd.Series(created).where(rng.random(n_rows) > 0.02)
+    return pd.DataFrame({
+        ID_COL: ids,
+        "Обладнання": equipment,
+        "Лінія": line,
+        "Опис робіт": description,
+        "Час створення (datetime)": created,
+    })
+
+
+@pytest.mark.parametrize("n_requests, seed", [(50, 0), (5000, 1), (20000, 2)])
+def test_flags_match_sort_diff_merge(n_requests, seed):
+    df = make_requests(n_requests, seed)
+    expected = sort_diff_merge(df)
+    result = repeat_flags_for_rows(df)
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+
+
+def test_window_boundaries():
+    created = pd.to_datetime(["2024-01-01 00:00", "2024-01-01 00:01", "2024-01-01 00:03", "2024-01-04 00:03", "2024-01-07 00:04"])
+    df = pd.DataFrame({
+        ID_COL: range(5), "Обладнання": "Прес 1", "Лінія": None, "Опис робіт": "Витік", "Час створення (datetime)": created,
+    })
+    # Рівно 1 хвилина не рахується, рівно 3 доби - рахується
+    assert repeat_flags_for_rows(df).tolist() == [False, False, True, True, False]
+    assert sort_diff_merge(df).tolist() == [False, False, True, True, False]
+
+
+def test_incremental_update_matches_full_recompute():
+    df = make_requests(3000, seed=3, rows_per_request=1)
+    repeat_index = None
+    for start in range(0, len(df), 800):
+        repeat_index = update_repeat_index(repeat_index, df.iloc[start:start + 800])
+    full = flag_repeat_index(build_repeat_index(df))
+    incremental = repeat_index.set_index(ID_COL)[FLAG_COL].sort_index()
+    pd.testing.assert_series_equal(incremental, full.set_index(ID_COL)[FLAG_COL].sort_index())
+
+
+def test_incremental_update_replaces_changed_requests():
+    df = make_requests(2000, seed=4, rows_per_request=1)
+    repeat_index = update_repeat_index(None, df)
+    # Частина заявок змінює опис і час: старі записи мають бути замінені
+    changed = df.sample(300, random_state=0).copy()
+    changed["Опис робіт"] = "Шум"
+    changed["Час створення (datetime)"] += pd.Timedelta(hours=5)
+    repeat_index = update_repeat_index(repeat_index, changed)
+
+    current = pd.concat([df[~df[ID_COL].isin(changed[ID_COL])], changed], ignore_index=True)
+    full = flag_repeat_index(build_repeat_index(current))
+    assert len(repeat_index) == len(full)
+    incremental = repeat_index.set_index(ID_COL)[FLAG_COL].sort_index()
+    pd.testing.assert_series_equal(incremental, full.set_index(ID_COL)[FLAG_COL].sort_index())
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rollup_cube import (
+    COUNT_COL, DAY_COL, build_rollup_cube, count_col, cube_totals, measure_mean, rollup, slice_cube, sum_col,
+    top_n_with_other,
+)
+
+
+def make_tasks(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    created = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 60 * 24 * 90, n_rows), unit="min")
+    execution = rng.uniform(0, 300, n_rows)
+    execution[rng.random(n_rows) < 0.2] = np.nan
+    return pd.DataFrame({
+        "Ідентифікатор": np.arange(n_rows),
+        DAY_COL: created.date,
+        "Цех": rng.choice(["Цех 1", "Цех 2", None], n_rows),
+        "Лінія": rng.choice(["Лінія 1", "Лінія 2"], n_rows),
+        "Обладнання": rng.choice([f"Верстат {i}" for i in range(40)] + [None], n_rows),
+        "Тип заявки": rng.choice(["Простій", "Профілактика", "Ремонт"], n_rows),
+        "Підозріле повторення": rng.random(n_rows) < 0.3,
+        "Час до виконання (хв)": execution,
+        "Час до закриття (хв)": execution + rng.uniform(0, 100, n_rows),
+    })
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_cube_slices_match_direct_aggregation(seed):
+    tasks = make_tasks(3000, seed)
+    cells = build_rollup_cube(tasks)
+    start, end = pd.Timestamp("2024-01-20").date(), pd.Timestamp("2024-03-01").date()
+    selections = {"Цех": ["Цех 2"], "Тип заявки": ["Простій", "Ремонт"]}
+    sliced = slice_cube(cells, start, end, selections, anomalies_only=True)
+    expected = tasks[
+        (tasks[DAY_COL] >= start) & (tasks[DAY_COL] <= end) & tasks["Цех"].isin(["Цех 2"])
+        & tasks["Тип заявки"].isin(["Простій", "Ремонт"]) & tasks["Підозріле повторення"]
+    ]
+
+    totals = cube_totals(sliced)
+    assert totals[COUNT_COL] == len(expected)
+    assert totals[sum_col("Час до виконання (хв)")] == pytest.approx(expected["Час до виконання (хв)"].sum())
+    assert measure_mean(totals, "Час до закриття (хв)") == pytest.approx(expected["Час до закриття (хв)"].mean())
+
+    by_equipment = rollup(sliced, "Обладнання")
+    pd.testing.assert_series_equal(
+        measure_mean(by_equipment, "Час до закриття (хв)"),
+        expected.groupby("Обладнання")["Час до закриття (хв)"].mean(), check_names=False,
+    )
+    calendar = rollup(sliced, DAY_COL)[COUNT_COL]
+    assert calendar.tolist() == expected.groupby(DAY_COL).size().tolist()
+
+
+def test_top_n_buckets_the_rest_into_other():
+    tasks = make_tasks(2000)
+    by_equipment = rollup(build_rollup_cube(tasks), "Обладнання")
+    top = top_n_with_other(by_equipment, lambda g: g[sum_col("Час до виконання (хв)")], 10)
+    assert len(top) == 11
+    assert top.index[-1] == f"Інше ({len(by_equipment) - 10})"
+    assert top[COUNT_COL].sum() == by_equipment[COUNT_COL].sum()
+    expected_top = by_equipment[sum_col("Час до виконання (хв)")].nlargest(10)
+    assert top[sum_col("Час до виконання (хв)")].iloc[:10].tolist() == expected_top.tolist()
+    assert top_n_with_other(by_equipment, lambda g: g[COUNT_COL], 100).shape == by_equipment.shape
+    assert count_col("Час до виконання (хв)") in top.columns
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import build_search_index, search_mask
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    descriptions = np.array([
+        "Не працює насос", "насос не працює (терміново)", "Заміна м’ясорубки", "Заміна м'ясорубки",
+        "витік  масла", "Шум+вібрація", "", None, "Перегрів двигуна 2",
+    ], dtype=object)
+    ids = rng.integers(1, 5000, 3000)
+    return pd.DataFrame({"Ідентифікатор": ids, "Опис робіт": rng.choice(descriptions, 3000)})
+
+
+def contains(df, query, case):
+    return (
+        df["Ідентифікатор"].astype(str).str.contains(query, case=case, regex=False, na=False)
+        | df["Опис робіт"].astype(str).str.contains(query, case=case, regex=False, na=False)
+    ).to_numpy()
+
+
+@pytest.mark.parametrize("query", ["насос", "НАСОС", "(", "(терм", "Шум+в", "12", "4", "nan", "м’ясо", "zzz", "  "])
+def test_matches_literal_contains(df, query):
+    search_index = build_search_index(df)
+    np.testing.assert_array_equal(search_mask(search_index, query), contains(df, query, case=False))
+    np.testing.assert_array_equal(search_mask(search_index, query, case_sensitive=True), contains(df, query, case=True))
+
+
+def test_normalization_ignores_apostrophes_and_spaces(df):
+    search_index = build_search_index(df)
+    mask = search_mask(search_index, "м'ясо", normalize=True)
+    expected = contains(df, "м'ясо", case=False) | contains(df, "м’ясо", case=False)
+    np.testing.assert_array_equal(mask, expected)
+    assert search_mask(search_index, "витік масла", normalize=True).sum() == contains(df, "витік  масла", case=False).sum()
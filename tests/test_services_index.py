@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services_index import build_services_index, explode_services, service_totals, services_mask
+
+SERVICES = ["Механіки", "Електрики, Механіки", " КВП ,Механіки", "", None, "Енергетики,,Електрики", "Механіки, Механіки"]
+
+
+def split_lists(services):
+    # Попередня реалізація: розбір лямбдою після fillna("")
+    return services.fillna("").apply(lambda x: [s.strip() for s in str(x).split(',') if s.strip()])
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Відповідальні служби": pd.Series(rng.choice(np.array(SERVICES, dtype=object), 2000), dtype=object),
+        "Час до виконання (хв)": rng.choice([np.nan, 5.0, 30.0, 120.0], 2000),
+    })
+
+
+def test_services_and_mask_match_string_parsing(df):
+    services_index = build_services_index(df["Відповідальні служби"])
+    assert services_index.services == sorted({s for parts in split_lists(df["Відповідальні служби"]) for s in parts})
+    selected = ["Електрики", "КВП"]
+    expected = split_lists(df["Відповідальні служби"]).apply(lambda parts: any(s in selected for s in parts))
+    np.testing.assert_array_equal(services_mask(services_index, selected), expected.to_numpy())
+
+
+@pytest.mark.parametrize("selected", [[], ["Механіки"], ["Електрики", "Невідома служба"]])
+def test_explode_matches_pandas_explode(df, selected):
+    services_index = build_services_index(df["Відповідальні служби"])
+    subset = df.sample(700, random_state=1)
+    expected = subset.assign(**{"Відповідальні служби": split_lists(subset["Відповідальні служби"])}).explode("Відповідальні служби")
+    if selected:
+        expected = expected[expected["Відповідальні служби"].isin(selected)]
+    result = explode_services(subset, df.index.get_indexer(subset.index), services_index, selected)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_service_totals_match_exploded_groupby(df):
+    services_index = build_services_index(df["Відповідальні служби"])
+    subset = df.iloc[::3]
+    exploded = subset.assign(**{"Відповідальні служби": split_lists(subset["Відповідальні служби"])}).explode("Відповідальні служби")
+    grouped = exploded.groupby("Відповідальні служби")["Час до виконання (хв)"]
+    totals = service_totals(services_index, df.index.get_indexer(subset.index), subset["Час до виконання (хв)"])
+    np.testing.assert_array_equal(totals.loc[grouped.size().index, "Кількість заявок"], grouped.size())
+    np.testing.assert_allclose(totals.loc[grouped.size().index, "Сума"], grouped.sum())